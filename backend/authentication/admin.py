@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile
+from .models import UserProfile, EmailOutbox
 
 # Register your models here.
 @admin.register(UserProfile)
@@ -7,4 +7,11 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'age', 'gender', 'is_email_verified', 'created_at']
     list_filter = ['gender', 'is_email_verified', 'created_at']
     search_fields = ['user__username', 'user__email']
-    readonly_fields = ['created_at', 'updated_at']  
\ No newline at end of file
+    readonly_fields = ['created_at', 'updated_at']  
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class AuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from preferences.models import UserPreference
+        from .models import UserProfile
+        from .tokens import profile_saved, user_deleted, user_saved
+        from .user_cache import preference_links_changed, user_changed
+
+        for model in (User, UserProfile, UserPreference):
+            post_save.connect(user_changed, sender=model, dispatch_uid=f'user_detail_save_{model.__name__}')
+            post_delete.connect(user_changed, sender=model, dispatch_uid=f'user_detail_delete_{model.__name__}')
+
+        for field in ('preferred_districts', 'preferred_geographies'):
+            m2m_changed.connect(
+                preference_links_changed,
+                sender=getattr(UserPreference, field).through,
+                dispatch_uid=f'user_detail_links_{field}',
+            )
+
+        # Token revocation and stale-claims tracking
+        post_save.connect(user_saved, sender=User, dispatch_uid='jwt_user_saved')
+        post_delete.connect(user_deleted, sender=User, dispatch_uid='jwt_user_deleted')
+        post_save.connect(profile_saved, sender=UserProfile, dispatch_uid='jwt_profile_saved')
@@ -0,0 +1,58 @@
+"""
+Expiry sweeps for abandoned signups
+Both sweeps walk their partial index in small batches, each in its own short
+transaction, so no lock is held for long and the sweep can run alongside
+live traffic (see the sweep_expired_accounts command).
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UserProfile
+
+# Unverified accounts older than this are deleted
+UNVERIFIED_ACCOUNT_TTL = timedelta(days=7)
+
+
+def clear_expired_otps(batch_size=1000, now=None):
+    """Clear OTPs past their expiry. Returns the number of profiles cleared."""
+    now = now or timezone.now()
+    cleared = 0
+    while True:
+        ids = list(
+            UserProfile.objects.filter(otp_expiry__lt=now)
+            .order_by('otp_expiry')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return cleared
+        cleared += UserProfile.objects.filter(id__in=ids, otp_expiry__lt=now).update(otp=None, otp_expiry=None)
+
+
+def unverified_accounts(older_than=UNVERIFIED_ACCOUNT_TTL, now=None):
+    """Profiles of accounts that never verified their email within older_than"""
+    cutoff = (now or timezone.now()) - older_than
+    return UserProfile.objects.filter(
+        is_email_verified=False,
+        created_at__lt=cutoff,
+        user__is_staff=False,
+        user__is_superuser=False,
+    )
+
+
+def purge_unverified_accounts(older_than=UNVERIFIED_ACCOUNT_TTL, batch_size=500, now=None):
+    """
+    Delete accounts (with their profile and preferences) that never verified
+    their email. Returns the number of users deleted.
+    """
+    stale = unverified_accounts(older_than, now)
+    purged = 0
+    while True:
+        with transaction.atomic():
+            user_ids = list(stale.order_by('created_at').values_list('user_id', flat=True)[:batch_size])
+            if not user_ids:
+                return purged
+            _, deleted = User.objects.filter(id__in=user_ids).delete()
+            purged += deleted.get(User._meta.label, 0)
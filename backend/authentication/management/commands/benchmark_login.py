@@ -0,0 +1,96 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from authentication.models import UserProfile, users_with_email
+from authentication.views import LoginView
+from backend.query_budget import count_queries
+
+USERNAME_PREFIX = 'loadtest_'
+PASSWORD = 'loadtest-password'
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test login: seed verified users, then report p50/p99 latency of "
+        "the email lookup and of the full login request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000, help="Seeded users to test against")
+        parser.add_argument('--requests', type=int, default=200, help="Number of logins to time")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--cleanup', action='store_true', help="Delete the seeded users and exit")
+
+    def handle(self, *args, **options):
+        seeded = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        if options['cleanup']:
+            deleted, _ = seeded.delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} rows."))
+            return
+
+        total = options['users']
+        self.seed(seeded.count(), total, options['batch_size'])
+
+        view = LoginView.as_view()
+        factory = APIRequestFactory()
+        lookups, requests, query_counts = [], [], []
+
+        for _ in range(options['requests']):
+            n = random.randrange(total)
+            # Mixed case checks that the case-insensitive path hits the index
+            email = f'{USERNAME_PREFIX}{n}@Example.com'
+
+            started = time.perf_counter()
+            users_with_email(email).select_related('profile').first()
+            lookups.append((time.perf_counter() - started) * 1000)
+
+            request = factory.post('/api/auth/login/', {'email': email, 'password': PASSWORD}, format='json')
+            with count_queries() as counter:
+                started = time.perf_counter()
+                response = view(request)
+                requests.append((time.perf_counter() - started) * 1000)
+            query_counts.append(counter.count)
+            if response.status_code != 200:
+                self.stderr.write(f"Login failed for {email}: {response.status_code} {response.data}")
+
+        lookups.sort()
+        requests.sort()
+        self.stdout.write(f"{len(requests)} logins against {total} users:")
+        self.stdout.write(
+            f"  email lookup ms  p50 {statistics.median(lookups):.2f}  p99 {percentile(lookups, 0.99):.2f}"
+        )
+        self.stdout.write(
+            f"  login request ms p50 {statistics.median(requests):.1f}  p99 {percentile(requests, 0.99):.1f}  "
+            f"queries/login {max(query_counts)}"
+        )
+        self.stdout.write("Request latency includes password hashing (PASSWORD_HASHERS).")
+
+    def seed(self, existing, total, batch_size):
+        if existing >= total:
+            return
+        self.stdout.write(f"Seeding users {existing}..{total - 1}")
+        # One hash for every seeded user keeps seeding fast
+        password = make_password(PASSWORD)
+        for start in range(existing, total, batch_size):
+            end = min(start + batch_size, total)
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=f'{USERNAME_PREFIX}{n}', email=f'{USERNAME_PREFIX}{n}@example.com', password=password)
+                    for n in range(start, end)
+                ])
+                UserProfile.objects.bulk_create([
+                    UserProfile(user=user, age=30, gender='O', is_email_verified=True)
+                    for user in users
+                ])
+            self.stdout.write(f"  {end}/{total}")
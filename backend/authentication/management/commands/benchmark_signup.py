@@ -0,0 +1,81 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from authentication.views import SignupView
+from backend.query_budget import count_queries
+from preferences.models import District, Geography
+
+
+class Rollback(Exception):
+    """Raised to undo a benchmark signup"""
+
+
+class Command(BaseCommand):
+    help = "Measure queries and latency per signup; every signup is rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20, help="Number of signups to run")
+        parser.add_argument('--districts', type=int, default=3, help="Preferred districts per signup")
+        parser.add_argument('--geographies', type=int, default=3, help="Preferred geographies per signup")
+        parser.add_argument('--show-queries', action='store_true', help="Print the SQL of the first signup")
+
+    def handle(self, *args, **options):
+        districts = list(District.objects.values_list('code', flat=True)[:options['districts']])
+        geographies = list(Geography.objects.values_list('code', flat=True)[:options['geographies']])
+        if not districts or not geographies:
+            raise CommandError("No districts or geographies found; run the migrations first")
+
+        view = SignupView.as_view()
+        factory = APIRequestFactory()
+        timings = []
+        query_counts = []
+
+        for i in range(options['count']):
+            suffix = uuid.uuid4().hex[:12]
+            request = factory.post('/api/auth/signup/', {
+                'username': f'bench_{suffix}',
+                'email': f'bench_{suffix}@example.com',
+                'password': 'benchmark-password',
+                'age': 30,
+                'gender': 'O',
+                'preferred_districts': districts,
+                'preferred_geographies': geographies,
+                'budget_range': 'medium',
+            }, format='json')
+
+            try:
+                with transaction.atomic():
+                    with count_queries() as counter:
+                        started = time.perf_counter()
+                        response = view(request)
+                        elapsed = time.perf_counter() - started
+                    raise Rollback
+            except Rollback:
+                pass
+
+            if response.status_code != 201:
+                raise CommandError(f"Signup failed with {response.status_code}: {response.data}")
+
+            timings.append(elapsed * 1000)
+            query_counts.append(counter.count)
+            if i == 0 and options['show_queries']:
+                for sql in counter.queries:
+                    self.stdout.write(f"  {sql}")
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{len(timings)} signups: "
+            f"queries/signup min {min(query_counts)} max {max(query_counts)}; "
+            f"latency ms mean {statistics.mean(timings):.1f} "
+            f"p50 {statistics.median(timings):.1f} p95 {p95:.1f} max {timings[-1]:.1f}"
+        )
+        self.stdout.write(
+            "Latency is dominated by password hashing (PASSWORD_HASHERS); "
+            "the figures exclude the final commit."
+        )
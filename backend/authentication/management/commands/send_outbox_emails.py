@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling for new emails instead of exiting when none are due")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds to wait between polls when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+
+            if sent:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} emails; {total_failed} failed attempts."))
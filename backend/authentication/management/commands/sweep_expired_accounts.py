@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from authentication import expiry
+
+
+class Command(BaseCommand):
+    help = "Clear expired OTPs and delete accounts that never verified their email"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unverified-days', type=int, default=expiry.UNVERIFIED_ACCOUNT_TTL.days,
+                            help="Age in days after which an unverified account is deleted")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many accounts would be deleted")
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['unverified_days'])
+
+        if options['dry_run']:
+            count = expiry.unverified_accounts(older_than).count()
+            self.stdout.write(f"{count} unverified accounts would be deleted.")
+            return
+
+        cleared = expiry.clear_expired_otps(batch_size=options['batch_size'])
+        purged = expiry.purge_unverified_accounts(older_than, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Cleared {cleared} expired OTPs; deleted {purged} unverified accounts."
+        ))
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """Fail with a readable message instead of an index build error"""
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.exclude(email='')
+        .values(email_lower=Lower('email'))
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Merge or rename the accounts sharing these emails before migrating: "
+            + ', '.join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0003_email_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        # auth_user belongs to django.contrib.auth, so the index is created in
+        # SQL. Empty emails (e.g. some superusers) map to NULL and don't clash.
+        # Must match authentication.models.NormalizedEmail.
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX auth_user_email_lower_uniq ON auth_user ((NULLIF(LOWER(email), '')))",
+            reverse_sql="DROP INDEX auth_user_email_lower_uniq",
+        ),
+    ]
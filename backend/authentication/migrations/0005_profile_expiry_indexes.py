@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_user_email_lower_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('otp_expiry__isnull', False)), fields=['otp_expiry'], name='profile_otp_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('is_email_verified', False)), fields=['created_at'], name='profile_unverified_idx'),
+        ),
+    ]
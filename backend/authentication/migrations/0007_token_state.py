@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenState',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('revoked_at', models.BigIntegerField(blank=True, null=True)),
+                ('claims_changed_at', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'jwt_token_state',
+            },
+        ),
+    ]
@@ -10,6 +10,21 @@ GENDER_CHOICES = [
     ('O', 'Other'),
 ]
 
+class NormalizedEmail(models.Func):
+    """
+    Lowercased email, with empty emails as NULL. This is the expression the
+    auth_user_email_lower_uniq index (migration 0004) is built on, so lookups
+    through it are indexed and case-insensitive.
+    """
+    template = "NULLIF(LOWER(%(expressions)s), '')"
+    output_field = models.CharField()
+
+
+def users_with_email(email):
+    """Users whose email matches case-insensitively (at most one)"""
+    return User.objects.alias(email_key=NormalizedEmail('email')).filter(email_key=email.lower())
+
+
 class UserProfile(models.Model):
     """
     Extended user profile for travellers
@@ -55,3 +70,64 @@ class UserProfile(models.Model):
 
     class Meta:
         db_table = 'user_profiles'
+        indexes = [
+            # Expiry sweeper: outstanding OTPs by expiry, unverified accounts by age
+            models.Index(fields=['otp_expiry'], name='profile_otp_expiry_idx',
+                         condition=models.Q(otp_expiry__isnull=False)),
+            models.Index(fields=['created_at'], name='profile_unverified_idx',
+                         condition=models.Q(is_email_verified=False)),
+        ]
+
+
+class EmailOutbox(models.Model):
+    """
+    Emails waiting to be delivered by the outbox worker.
+    Rows are written in the same transaction as the change that triggers the
+    email, so an email is sent if and only if that change was committed.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+    class Meta:
+        db_table = 'email_outbox'
+        ordering = ['created_at']
+        indexes = [
+            # Worker polls for due pending emails
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+
+
+class TokenState(models.Model):
+    """
+    Per-user JWT state (see authentication/tokens.py), as Unix timestamps
+    comparable with the iat claim. Keyed by the plain user id rather than a
+    foreign key, so a deleted user's revocation outlives the user row.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    revoked_at = models.BigIntegerField(null=True, blank=True)
+    claims_changed_at = models.BigIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Token state of user {self.user_id}"
+
+    class Meta:
+        db_table = 'jwt_token_state'
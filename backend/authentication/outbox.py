@@ -0,0 +1,97 @@
+"""
+Transactional email outbox
+Request handlers call enqueue_email() inside their transaction instead of
+talking to SMTP. The send_outbox_emails worker delivers due emails in
+batches over a single SMTP connection and retries failures with backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+
+def enqueue_email(to_email, subject, body, from_email=None):
+    """Queue an email; it is only sent once the surrounding transaction commits"""
+    return EmailOutbox.objects.create(
+        to_email=to_email,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        body=body,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 1m, 2m, 4m, ..."""
+    return RETRY_BASE_DELAY * (2 ** (attempts - 1))
+
+
+def deliver_batch(batch_size=50):
+    """
+    Send up to batch_size due emails. Rows are locked while they are sent,
+    so parallel workers skip them. Returns (sent, failed) counts.
+    """
+    sent = failed = 0
+    with transaction.atomic():
+        emails = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if not emails:
+            return sent, failed
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error(f"Could not connect to the mail server: {e}")
+            for email in emails:
+                record_failure(email, e)
+            return sent, len(emails)
+
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email,
+                    to=[email.to_email],
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception as e:
+                    logger.warning(f"Error sending email {email.id} to {email.to_email}: {e}")
+                    record_failure(email, e)
+                    failed += 1
+                else:
+                    email.status = 'SENT'
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    email.last_error = ''
+                    email.save(update_fields=['status', 'sent_at', 'attempts', 'last_error'])
+                    sent += 1
+        finally:
+            connection.close()
+
+    return sent, failed
+
+
+def record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'FAILED'
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
@@ -1,8 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import check_password
-from .models import UserProfile
+from django.db.models import Q
+from .models import NormalizedEmail, UserProfile, users_with_email
+from preferences.catalog import get_catalog
 from preferences.models import District, Geography, UserPreference
+from preferences.serializers import CatalogRelatedField
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for user profile data"""
@@ -25,8 +28,8 @@ class GeographySerializer(serializers.ModelSerializer):
         fields = ['code', 'name', 'description']
 
 class UserPreferenceSerializer(serializers.ModelSerializer):
-    preferred_districts = DistrictSerializer(many=True, read_only=True)
-    preferred_geographies = GeographySerializer(many=True, read_only=True)
+    preferred_districts = CatalogRelatedField('districts', DistrictSerializer)
+    preferred_geographies = CatalogRelatedField('geographies', GeographySerializer)
     
     class Meta:
         model = UserPreference
@@ -42,36 +45,54 @@ class UserDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'profile', 'preferences']
 
 class SignupSerializer(serializers.Serializer):
-    """Serializer for user registration"""
+    """
+    Serializer for user registration
+    Uniqueness is checked with one query; district and geography codes are
+    checked against the in-process catalog.
+    """
     username = serializers.CharField(max_length=150)
     email = serializers.EmailField()
     password = serializers.CharField(min_length=8, write_only=True)
     age = serializers.IntegerField(min_value=16, max_value=120)
     gender = serializers.ChoiceField(choices=[('M', 'Male'), ('F', 'Female'), ('O', 'Other')])
-    preferred_districts = serializers.SlugRelatedField(
-        slug_field='code', 
-        queryset=District.objects.all(), 
-        many=True
-    )
-    preferred_geographies = serializers.SlugRelatedField(
-        slug_field='code', 
-        queryset=Geography.objects.all(), 
-        many=True
-    )
+    preferred_districts = serializers.ListField(child=serializers.CharField(max_length=4))
+    preferred_geographies = serializers.ListField(child=serializers.CharField(max_length=10))
     budget_range = serializers.ChoiceField(
         choices=[('low', 'Budget'), ('medium', 'Mid-range'), ('high', 'Luxury')],
         required=False
     )
     
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Email already registered.")
-        return value
+    def validate_preferred_districts(self, value):
+        return validate_codes('districts', value)
+    
+    def validate_preferred_geographies(self, value):
+        return validate_codes('geographies', value)
     
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("Username already taken.")
-        return value
+    def validate(self, data):
+        taken = User.objects.alias(email_key=NormalizedEmail('email')).filter(
+            Q(email_key=data['email'].lower()) | Q(username=data['username'])
+        ).values_list('email', 'username')
+        
+        errors = {}
+        for email, username in taken:
+            if email.lower() == data['email'].lower():
+                errors['email'] = ["Email already registered."]
+            if username == data['username']:
+                errors['username'] = ["Username already taken."]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+
+def validate_codes(catalog_name, codes):
+    """Check that every code exists in a reference catalog, without a query"""
+    codes = list(dict.fromkeys(codes))
+    missing = get_catalog(catalog_name).missing(codes)
+    if missing:
+        raise serializers.ValidationError(
+            [f"Object with code={code} does not exist." for code in missing]
+        )
+    return codes
 
 class LoginSerializer(serializers.Serializer):
     """Serializer for user login"""
@@ -82,9 +103,9 @@ class LoginSerializer(serializers.Serializer):
         email = data.get('email')
         password = data.get('password')
         
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        # User and profile in one indexed, joined query
+        user = users_with_email(email).select_related('profile').first()
+        if user is None:
             raise serializers.ValidationError("Invalid email or password.")
         
         if not user.check_password(password):
@@ -93,10 +114,10 @@ class LoginSerializer(serializers.Serializer):
         # Check if user has verified email
         try:
             profile = user.profile
-            if not profile.is_email_verified:
-                raise serializers.ValidationError("Please verify your email before logging in.")
         except UserProfile.DoesNotExist:
             raise serializers.ValidationError("User profile not found.")
+        if not profile.is_email_verified:
+            raise serializers.ValidationError("Please verify your email before logging in.")
         
         data['user'] = user
         return data
@@ -1,3 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from backend.query_budget import assert_max_queries
+
+from .views import SignupView
+
+
+class SignupQueryBudgetTests(TestCase):
+    """Signup runs a fixed number of queries, however many preferences are chosen"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def signup(self, username, districts, geographies):
+        with assert_max_queries(SignupView.query_budget):
+            response = self.client.post('/api/auth/signup/', {
+                'username': username,
+                'email': f'{username}@example.com',
+                'password': 'correct-horse-battery',
+                'age': 30,
+                'gender': 'F',
+                'preferred_districts': districts,
+                'preferred_geographies': geographies,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_signup_one_preference(self):
+        self.signup('alice', ['EKM'], ['BEACH'])
+        self.assertTrue(User.objects.filter(username='alice').exists())
+
+    def test_signup_many_preferences(self):
+        self.signup('bob', ['EKM', 'IDK', 'WYD', 'TVM'], ['BEACH', 'HILL', 'FRST'])
+        self.assertEqual(User.objects.get(username='bob').preferences.preferred_districts.count(), 4)
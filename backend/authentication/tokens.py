@@ -0,0 +1,190 @@
+"""
+JWTs that carry user claims, and authentication that trusts them
+
+Tokens issued at login/verification carry the username and the email-verified
+and local-host flags, and access tokens from the refresh endpoint get them
+re-read from the database. For read-only requests ClaimsJWTAuthentication
+builds a ClaimsUser from those claims instead of loading the User row. Writes
+still load the row, as JWTAuthentication does. So do reads when the cache is
+not shared between processes (see backend.caching), as revocations and claim
+changes would then only be seen by the process that recorded them.
+
+Per-user token state is stored in the TokenState table. The cache holds a
+read-through copy (a cache miss means "look it up", never "nothing revoked"),
+and each process keeps its own copy for TOKEN_STATE_TTL seconds:
+
+* ``revoked_at`` - tokens issued up to then are rejected (user deactivated
+  or deleted)
+* ``claims_changed_at`` - tokens issued before then carry stale flags, so
+  they authenticate through the database until the user logs in again
+"""
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.caching import shared_cache_available
+from .models import TokenState
+
+# How long a process trusts its copy of a user's token state
+TOKEN_STATE_TTL = 30
+# Local copies are dropped wholesale past this many users
+TOKEN_STATE_MAX_USERS = 10000
+# How long the cache keeps its copy of a user's token state
+TOKEN_STATE_CACHE_TIMEOUT = 24 * 60 * 60
+
+_local_state = {}
+_local_lock = threading.Lock()
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token (and derived access token) carrying the user's flags"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_claims(token, user)
+        return token
+
+
+def set_claims(token, user):
+    profile = getattr(user, 'profile', None)
+    token['username'] = user.username
+    token['is_email_verified'] = bool(profile and profile.is_email_verified)
+    token['is_local_host'] = bool(profile and profile.is_local_host)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that stamps the user's current flags on the new access token; a
+    plain refresh would copy the flags the refresh token was issued with
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.select_related('profile').filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        access = refresh.access_token
+        set_claims(access, user)
+        return {'access': str(access)}
+
+
+class ClaimsUser(TokenUser):
+    """Stateless user built from a token's claims"""
+
+    @property
+    def is_email_verified(self):
+        return self.token.get('is_email_verified', False)
+
+    @property
+    def is_local_host(self):
+        return self.token.get('is_local_host', False)
+
+
+def token_state_key(user_id):
+    return f'jwt_state:{user_id}'
+
+
+def get_token_state(user_id):
+    now = time.monotonic()
+    entry = _local_state.get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    key = token_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = load_token_state(user_id)
+        # add() so a copy written by mark_tokens() since the lookup is kept
+        cache.add(key, state, TOKEN_STATE_CACHE_TIMEOUT)
+    with _local_lock:
+        if len(_local_state) >= TOKEN_STATE_MAX_USERS:
+            _local_state.clear()
+        _local_state[user_id] = (now + TOKEN_STATE_TTL, state)
+    return state
+
+
+def load_token_state(user_id):
+    """A user's token state from the database, without the unset fields"""
+    row = TokenState.objects.filter(user_id=user_id).values('revoked_at', 'claims_changed_at').first() or {}
+    return {field: value for field, value in row.items() if value is not None}
+
+
+def mark_tokens(user_id, field):
+    """Record the current time as the user's revoked_at or claims_changed_at"""
+    # Whole seconds, like the iat claim
+    TokenState.objects.bulk_create(
+        [TokenState(user_id=user_id, **{field: int(time.time())})],
+        update_conflicts=True, unique_fields=['user_id'], update_fields=[field],
+    )
+
+    def refresh_copy():
+        cache.set(token_state_key(user_id), load_token_state(user_id), TOKEN_STATE_CACHE_TIMEOUT)
+        _local_state.pop(user_id, None)
+
+    transaction.on_commit(refresh_copy)
+
+
+def revoke_user_tokens(user_id):
+    mark_tokens(user_id, 'revoked_at')
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips the user query for safe methods when the
+    token carries current claims
+    """
+
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        state = get_token_state(user_id)
+        issued_at = validated_token.get('iat', 0)
+        if issued_at <= state.get('revoked_at', -1):
+            raise AuthenticationFailed("Token has been revoked.", code='token_revoked')
+
+        # Same-second tokens count as current, as iat has whole-second precision
+        claims_current = (
+            'is_email_verified' in validated_token
+            and issued_at >= state.get('claims_changed_at', -1)
+        )
+        if self.read_only and claims_current and shared_cache_available():
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
+
+
+def user_saved(sender, instance, **kwargs):
+    """post_save receiver for User: deactivation revokes the user's tokens"""
+    if not instance.is_active:
+        revoke_user_tokens(instance.pk)
+
+
+def user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+def profile_saved(sender, instance, created=False, **kwargs):
+    """post_save receiver for UserProfile: the flags in issued tokens may be stale"""
+    # Tokens issued before the profile existed carry both flags as False
+    if created and not (instance.is_email_verified or instance.is_local_host):
+        return
+    mark_tokens(instance.user_id, 'claims_changed_at')
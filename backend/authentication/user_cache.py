@@ -0,0 +1,105 @@
+"""
+Cached user-detail payloads
+The UserDetailSerializer payload (user, profile, preferences and the
+preferred districts/geographies) is built with one joined query plus two
+prefetches and cached per user. Each user has a version token in the cache;
+writes to the user, profile or preferences replace the token once they
+commit, which makes older payloads unreachable. The catalog versions are part
+of the key, so renaming a district or geography also refreshes the payloads.
+
+The version token only invalidates payloads for every process when the cache
+is shared between them; with a process-local cache (LocMem) a write in one
+worker or management command would leave stale payloads in the others, so
+payloads are then built on every request instead of cached.
+"""
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from backend.caching import shared_cache_available
+from preferences.catalog import catalog_version
+from .serializers import UserDetailSerializer
+
+PAYLOAD_TIMEOUT = 60 * 60
+
+
+def user_detail_queryset():
+    return User.objects.select_related('profile', 'preferences').prefetch_related(
+        'preferences__preferred_districts',
+        'preferences__preferred_geographies',
+    )
+
+
+def version_cache_key(user_id):
+    return f'user_detail_version:{user_id}'
+
+
+def user_version(user_id):
+    key = version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # add() so concurrent first readers agree on one token
+        cache.add(key, uuid.uuid4().hex[:12], None)
+        version = cache.get(key)
+    return version
+
+
+def payload_cache_key(user_id):
+    return 'user_detail:{}:{}:{}:{}'.format(
+        user_id, user_version(user_id),
+        catalog_version('districts'), catalog_version('geographies'),
+    )
+
+
+def get_user_detail(user_id):
+    """Serialized UserDetailSerializer data for a user, from the cache when possible"""
+    if not shared_cache_available():
+        return UserDetailSerializer(user_detail_queryset().get(pk=user_id)).data
+
+    key = payload_cache_key(user_id)
+    data = cache.get(key)
+    if data is None:
+        user = user_detail_queryset().get(pk=user_id)
+        data = UserDetailSerializer(user).data
+        cache.set(key, data, PAYLOAD_TIMEOUT)
+    return data
+
+
+def invalidate_user_detail(user_id):
+    """Drop a user's cached payload once the current transaction commits"""
+    transaction.on_commit(
+        lambda: cache.set(version_cache_key(user_id), uuid.uuid4().hex[:12], None)
+    )
+
+
+def user_changed(sender, instance, **kwargs):
+    """Signal receiver for User, UserProfile and UserPreference writes"""
+    user_id = instance.pk if sender is User else instance.user_id
+    if user_id is not None:
+        invalidate_user_detail(user_id)
+
+
+def preference_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """m2m_changed receiver for the preferred districts/geographies links"""
+    from preferences.models import UserPreference
+
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_user_detail(instance.user_id)
+        return
+
+    # Changed from the district/geography side: pk_set holds preference ids,
+    # except for clear(), where the links are read before they are removed
+    if action == 'pre_clear':
+        preference_ids = sender.objects.filter(
+            **{f'{instance._meta.model_name}_id': instance.pk}
+        ).values_list('userpreference_id', flat=True)
+    elif action in ('post_add', 'post_remove'):
+        preference_ids = pk_set
+    else:
+        return
+    user_ids = UserPreference.objects.filter(pk__in=list(preference_ids)).values_list('user_id', flat=True)
+    for user_id in user_ids:
+        invalidate_user_detail(user_id)
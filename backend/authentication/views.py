@@ -1,24 +1,27 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 import random
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import IntegrityError, transaction
 
-from .models import UserProfile
-from .serializers import (
-    SignupSerializer, LoginSerializer, OTPVerificationSerializer,
-    UserDetailSerializer
-)
+from .models import UserProfile, users_with_email
+from .outbox import enqueue_email
+from .tokens import ClaimsRefreshToken
+from .serializers import SignupSerializer, LoginSerializer, OTPVerificationSerializer
+from .user_cache import get_user_detail
+from places.feed import enqueue_warmup
 from preferences.models import UserPreference
 
 class SignupView(APIView):
     """Handle user registration with email verification"""
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
+    throttle_cost = 3
+    # 3 validation queries, 7 inserts and the savepoint/transaction statements
+    query_budget = 12
     
     def post(self, request):
         serializer = SignupSerializer(data=request.data)
@@ -28,6 +31,24 @@ class SignupView(APIView):
         
         data = serializer.validated_data
         
+        # User, profile, preferences and the verification email are
+        # committed together; the outbox worker sends the email
+        try:
+            with transaction.atomic():
+                user = self.create_account(data)
+        except IntegrityError:
+            # A concurrent signup took the username or email after validation
+            return Response(
+                {"detail": "An account with this username or email already exists."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            "detail": "Registration successful. Please check your email for verification code.",
+            "email": user.email
+        }, status=status.HTTP_201_CREATED)
+    
+    def create_account(self, data):
         # Create Django User
         user = User.objects.create_user(
             username=data['username'],
@@ -48,39 +69,40 @@ class SignupView(APIView):
             otp_expiry=otp_expiry
         )
         
-        # Create UserPreference
+        # Create UserPreference; the codes were validated, so the m2m
+        # rows are inserted directly in one statement per relation
         preferences = UserPreference.objects.create(
             user=user,
             budget_range=data.get('budget_range', '')
         )
-        preferences.preferred_districts.set(data['preferred_districts'])
-        preferences.preferred_geographies.set(data['preferred_geographies'])
-        
-        # Send OTP email
-        try:
-            send_mail(
-                subject="GlobeMate - Email Verification",
-                message=f"Hello {user.username},\n\nYour verification code is: {otp}\n\nThis code will expire in 10 minutes.",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False
-            )
-        except Exception as e:
-            # If email fails, clean up created objects
-            user.delete()
-            return Response(
-                {"detail": "Failed to send verification email. Please try again."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        DistrictLink = UserPreference.preferred_districts.through
+        GeographyLink = UserPreference.preferred_geographies.through
+        DistrictLink.objects.bulk_create([
+            DistrictLink(userpreference_id=preferences.pk, district_id=code)
+            for code in data['preferred_districts']
+        ])
+        GeographyLink.objects.bulk_create([
+            GeographyLink(userpreference_id=preferences.pk, geography_id=code)
+            for code in data['preferred_geographies']
+        ])
+        
+        # Warm the place feed for the new preferences before the first login
+        enqueue_warmup(data['preferred_districts'], data['preferred_geographies'])
+        
+        # Queue OTP email
+        enqueue_email(
+            to_email=user.email,
+            subject="GlobeMate - Email Verification",
+            body=f"Hello {user.username},\n\nYour verification code is: {otp}\n\nThis code will expire in 10 minutes.",
+        )
         
-        return Response({
-            "detail": "Registration successful. Please check your email for verification code.",
-            "email": user.email
-        }, status=status.HTTP_201_CREATED)
+        return user
 
 class VerifyOTPView(APIView):
     """Verify email with OTP code"""
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
+    throttle_cost = 1
     
     def post(self, request):
         serializer = OTPVerificationSerializer(data=request.data)
@@ -91,10 +113,10 @@ class VerifyOTPView(APIView):
         email = serializer.validated_data['email']
         otp = serializer.validated_data['otp']
         
-        try:
-            user = User.objects.get(email=email)
-            profile = user.profile
-        except (User.DoesNotExist, UserProfile.DoesNotExist):
+        # User and profile in one indexed, joined query
+        user = users_with_email(email).select_related('profile').first()
+        profile = getattr(user, 'profile', None)
+        if profile is None:
             return Response(
                 {"detail": "Invalid email or verification code."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -117,8 +139,8 @@ class VerifyOTPView(APIView):
         profile.clear_otp()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
-        user_data = UserDetailSerializer(user).data
+        refresh = ClaimsRefreshToken.for_user(user)
+        user_data = get_user_detail(user.pk)
         
         return Response({
             "detail": "Email verified successfully.",
@@ -132,6 +154,8 @@ class VerifyOTPView(APIView):
 class LoginView(APIView):
     """Handle user login"""
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
+    throttle_cost = 1
     
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -142,8 +166,8 @@ class LoginView(APIView):
         user = serializer.validated_data['user']
         
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
-        user_data = UserDetailSerializer(user).data
+        refresh = ClaimsRefreshToken.for_user(user)
+        user_data = get_user_detail(user.pk)
         
         return Response({
             "detail": "Login successful.",
@@ -157,6 +181,8 @@ class LoginView(APIView):
 class ResendOTPView(APIView):
     """Resend OTP for email verification"""
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
+    throttle_cost = 3
     
     def post(self, request):
         email = request.data.get('email')
@@ -167,10 +193,10 @@ class ResendOTPView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            user = User.objects.get(email=email)
-            profile = user.profile
-        except (User.DoesNotExist, UserProfile.DoesNotExist):
+        # User and profile in one indexed, joined query
+        user = users_with_email(email).select_related('profile').first()
+        profile = getattr(user, 'profile', None)
+        if profile is None:
             return Response(
                 {"detail": "No account found with this email."},
                 status=status.HTTP_404_NOT_FOUND
@@ -182,25 +208,17 @@ class ResendOTPView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Generate new OTP
+        # Generate new OTP and queue the email with it
         otp = str(random.randint(100000, 999999))
-        profile.otp = otp
-        profile.otp_expiry = timezone.now() + timedelta(minutes=10)
-        profile.save()
-        
-        # Send email
-        try:
-            send_mail(
+        with transaction.atomic():
+            profile.otp = otp
+            profile.otp_expiry = timezone.now() + timedelta(minutes=10)
+            profile.save()
+            
+            enqueue_email(
+                to_email=user.email,
                 subject="GlobeMate - New Verification Code",
-                message=f"Hello {user.username},\n\nYour new verification code is: {otp}\n\nThis code will expire in 10 minutes.",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=False
-            )
-        except Exception:
-            return Response(
-                {"detail": "Failed to send email. Please try again."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                body=f"Hello {user.username},\n\nYour new verification code is: {otp}\n\nThis code will expire in 10 minutes.",
             )
         
         return Response({
@@ -212,7 +230,9 @@ class UserProfileView(APIView):
     """Get current user's profile information"""
     permission_classes = [permissions.IsAuthenticated]
     
+    # Authentication, plus the joined user query and two prefetches on a cache miss
+    query_budget = 4
+    
     def get(self, request):
-        serializer = UserDetailSerializer(request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(get_user_detail(request.user.pk), status=status.HTTP_200_OK)
   
@@ -0,0 +1,92 @@
+"""
+Shared cache helpers
+
+Features that keep cross-process state in the cache (user payload versions,
+token state, rate limit buckets) check shared_cache_available() and fall
+back to the database, or to per-process behaviour, when the cache is local
+to each process.
+
+DatabaseCache is Django's database cache with its queries marked, so query
+budgets (backend/query_budget.py) and metrics report them apart from the
+view's own queries: they are cache round trips, which don't touch the
+database at all with Redis or Memcached, the production backends. The
+database cache is a development default; `check --deploy` warns about it.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends import db
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+PRODUCTION_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+_cache_io = ContextVar('cache_io', default=False)
+
+
+def shared_cache_available(alias='default'):
+    """False for caches that live in (or do nothing outside) each process"""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+def in_cache_query():
+    """Whether queries run now are issued by DatabaseCache"""
+    return _cache_io.get()
+
+
+@contextmanager
+def cache_io():
+    token = _cache_io.set(True)
+    try:
+        yield
+    finally:
+        _cache_io.reset(token)
+
+
+class DatabaseCache(db.DatabaseCache):
+    """django.core.cache.backends.db.DatabaseCache, with its queries marked"""
+
+    def get_many(self, keys, version=None):
+        with cache_io():
+            return super().get_many(keys, version)
+
+    def has_key(self, key, version=None):
+        with cache_io():
+            return super().has_key(key, version)
+
+    def clear(self):
+        with cache_io():
+            return super().clear()
+
+    def _base_set(self, mode, key, value, timeout=db.DEFAULT_TIMEOUT):
+        with cache_io():
+            return super()._base_set(mode, key, value, timeout)
+
+    def _base_delete_many(self, keys):
+        with cache_io():
+            return super()._base_delete_many(keys)
+
+
+@register(Tags.caches, deploy=True)
+def check_production_cache(app_configs, **kwargs):
+    """Warn when the default cache is not Redis or Memcached"""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PRODUCTION_BACKENDS:
+        return []
+    return [Warning(
+        f"The default cache is {backend}.",
+        hint=(
+            "Token state, user payloads and rate limit buckets live in the default cache; "
+            "set CACHE_BACKEND/CACHE_LOCATION to Redis or Memcached in production."
+        ),
+        id='backend.W001',
+    )]
@@ -0,0 +1,56 @@
+"""
+Conditional GET support for API views
+
+Views compute their validators (an ETag and/or a Last-Modified time) from
+cheap version information, ask ``not_modified()`` whether the client's copy
+is still current, and only serialize when it isn't:
+
+    etag = ...
+    cached = not_modified(request, etag=etag, cache_control=CATALOG_CACHE)
+    if cached:
+        return cached
+    response = Response(serializer.data)
+    return with_validators(response, etag=etag, cache_control=CATALOG_CACHE)
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+# Cache-Control policies per kind of endpoint
+STATIC_CACHE = {'public': True, 'max_age': 24 * 60 * 60}
+CATALOG_CACHE = {'public': True, 'max_age': 60 * 60}
+# Per-user data: may be stored by the client but must be revalidated
+PRIVATE_REVALIDATE = {'private': True, 'no_cache': True}
+
+
+def make_etag(*parts):
+    """Strong ETag value derived from the given version parts"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest[:32])
+
+
+def with_validators(response, etag=None, last_modified=None, cache_control=None, vary=None):
+    """Attach ETag, Last-Modified, Cache-Control and Vary headers to a response"""
+    if etag:
+        response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    if cache_control:
+        patch_cache_control(response, **cache_control)
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
+
+
+def not_modified(request, etag=None, last_modified=None, cache_control=None, vary=None):
+    """
+    Evaluate If-None-Match / If-Modified-Since (and If-Match /
+    If-Unmodified-Since) against the validators. Returns the 304 (or 412)
+    response to send, or None when the full response is needed.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        return None
+    return with_validators(response, etag, last_modified, cache_control, vary)
@@ -0,0 +1,252 @@
+"""
+Request and upstream performance metrics
+
+``MetricsMiddleware`` times every request and the database queries it runs.
+Service code wraps external API calls in ``upstream_call(service, operation)``,
+and views can time other parts of their work with ``timed(phase)``. The
+numbers are kept per process and exposed in two ways:
+
+* ``/metrics`` - Prometheus text format: per-endpoint latency histograms,
+  query counts and time (database cache queries apart), and per-upstream
+  call counts, latency and errors.
+  Every worker process reports its own numbers. The endpoint requires
+  ``METRICS_TOKEN`` as a bearer token; without one it answers 404, unless
+  DEBUG is on.
+* ``Server-Timing`` - with ``SERVER_TIMING`` on, each response carries the
+  time its request spent in the database, each upstream API and each timed
+  phase, e.g. ``db;dur=12.5;desc="4 queries", google_places_search;dur=301.2``
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from .caching import in_cache_query
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'http_requests_total': ('counter', "Requests by endpoint, method and status", None),
+    'http_request_duration_seconds': ('histogram', "Request latency by endpoint", LATENCY_BUCKETS),
+    'db_queries_per_request': ('histogram', "Database queries per request by endpoint", QUERY_COUNT_BUCKETS),
+    'db_query_seconds_total': ('counter', "Time spent in database queries by endpoint", None),
+    'cache_db_queries_per_request': ('histogram', "Database cache queries per request by endpoint", QUERY_COUNT_BUCKETS),
+    'cache_db_query_seconds_total': ('counter', "Time spent in database cache queries by endpoint", None),
+    'upstream_requests_total': ('counter', "External API calls by service, operation and outcome", None),
+    'upstream_request_duration_seconds': ('histogram', "External API call latency", LATENCY_BUCKETS),
+    'phase_duration_seconds': ('histogram', "Time spent in timed phases of request handling", LATENCY_BUCKETS),
+}
+
+
+class Registry:
+    """Thread-safe counters and histograms of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (name, labels) -> value, or [bucket counts, sum, count] for histograms
+        self.values = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        """Everything recorded so far, in Prometheus text exposition format"""
+        with self.lock:
+            snapshot = sorted(
+                (key, (list(value[0]), value[1], value[2]) if isinstance(value, list) else value)
+                for key, value in self.values.items()
+            )
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            samples = [(labels, value) for (metric, labels), value in snapshot if metric == name]
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == 'counter':
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                    continue
+                counts, total, count = value
+                for bound, bucket_count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', format_value(bound)),))} {bucket_count}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+# Phase -> [seconds, calls] for the request being handled, for Server-Timing
+_request_timings = ContextVar('request_timings', default=None)
+
+
+def record_phase(phase, seconds):
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(phase, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def timed(phase):
+    """Time a block of request handling, e.g. ``with timed('serialize'):``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('phase_duration_seconds', {'phase': phase}, elapsed)
+        record_phase(phase, elapsed)
+
+
+@contextmanager
+def upstream_call(service, operation):
+    """
+    Time one external API call. Exceptions raised inside the block (including
+    raise_for_status()) count as errors and are re-raised.
+    """
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        labels = {'service': service, 'operation': operation}
+        registry.inc('upstream_requests_total', dict(labels, outcome=outcome))
+        registry.observe('upstream_request_duration_seconds', labels, elapsed)
+        record_phase(f'{service}_{operation}', elapsed)
+
+
+class QueryTimer:
+    """
+    Database execute wrapper that counts and times queries, keeping those of
+    the database cache (backend.caching.DatabaseCache) apart
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.cache_count = 0
+        self.cache_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            if in_cache_query():
+                self.cache_seconds += elapsed
+                self.cache_count += 1
+            else:
+                self.seconds += elapsed
+                self.count += 1
+
+
+def endpoint_label(request):
+    """The URL pattern a request matched, so label values stay bounded"""
+    match = getattr(request, 'resolver_match', None)
+    return '/' + match.route if match is not None else 'unmatched'
+
+
+def server_timing_header(timings, timer, total):
+    entries = [f'db;dur={timer.seconds * 1000:.1f};desc="{timer.count} queries"']
+    if timer.cache_count:
+        entries.append(f'cache;dur={timer.cache_seconds * 1000:.1f};desc="{timer.cache_count} queries"')
+    entries.extend(
+        f'{phase};dur={seconds * 1000:.1f}' + (f';desc="{calls} calls"' if calls > 1 else '')
+        for phase, (seconds, calls) in timings.items()
+    )
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+class MetricsMiddleware:
+    """Records latency and database use per endpoint; keep first so it times everything"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        timings = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        wrappers = [connections[alias].execute_wrapper(timer) for alias in connections]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        try:
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+            _request_timings.reset(token)
+        total = time.perf_counter() - start
+
+        endpoint = endpoint_label(request)
+        registry.inc('http_requests_total', {
+            'endpoint': endpoint, 'method': request.method, 'status': response.status_code,
+        })
+        registry.observe('http_request_duration_seconds', {'endpoint': endpoint, 'method': request.method}, total)
+        registry.observe('db_queries_per_request', {'endpoint': endpoint}, timer.count)
+        registry.inc('db_query_seconds_total', {'endpoint': endpoint}, timer.seconds)
+        registry.observe('cache_db_queries_per_request', {'endpoint': endpoint}, timer.cache_count)
+        registry.inc('cache_db_query_seconds_total', {'endpoint': endpoint}, timer.cache_seconds)
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = server_timing_header(timings, timer, total)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    token = settings.METRICS_TOKEN
+    if not token:
+        # Fail closed: metrics name endpoints and upstreams
+        if not settings.DEBUG:
+            return HttpResponse(status=404)
+    elif request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
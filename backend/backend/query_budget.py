@@ -0,0 +1,129 @@
+"""
+Per-endpoint database query budgets
+
+Views declare how many queries they may run, either with a ``query_budget``
+class attribute or with the ``@query_budget(n)`` decorator. The budget is
+checked in two places:
+
+* ``assert_max_queries(n)`` - a context manager for tests that fails when
+  the wrapped block runs more than ``n`` queries.
+* ``QueryBudgetMiddleware`` - an optional development middleware that counts
+  the queries of every request and reports views that exceed their declared
+  budget. It is enabled with ``QUERY_BUDGET_MODE`` set to ``warn`` (log) or
+  ``raise`` (fail the request).
+
+Queries of the database cache (backend.caching.DatabaseCache) are counted
+separately from the view's own queries and listed in every report, so their
+cost stays visible without making budgets depend on the cache backend.
+"""
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .caching import in_cache_query
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view or block runs more queries than it declared"""
+
+
+class QueryCounter:
+    """Database execute wrapper that counts the queries it sees"""
+
+    def __init__(self):
+        self.count = 0
+        self.queries = []
+        self.cache_count = 0
+        self.cache_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if in_cache_query():
+            self.cache_count += 1
+            self.cache_queries.append(sql)
+        else:
+            self.count += 1
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries(using=None):
+    """Count the queries run inside the block on the given (or every) connection"""
+    counter = QueryCounter()
+    aliases = [using] if using else list(connections)
+    wrappers = [connections[alias].execute_wrapper(counter) for alias in aliases]
+    for wrapper in wrappers:
+        wrapper.__enter__()
+    try:
+        yield counter
+    finally:
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+
+
+@contextmanager
+def assert_max_queries(max_queries, using=None):
+    """Test helper: fail if the block runs more than max_queries queries"""
+    with count_queries(using) as counter:
+        yield counter
+    if counter.count > max_queries:
+        raise QueryBudgetExceeded(format_report(counter, max_queries, 'block'))
+
+
+def query_budget(max_queries):
+    """Declare the query budget of a function-based view"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_view_budget(view_func):
+    """Find the budget declared on a view function or its class"""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    return budget
+
+
+def format_report(counter, max_queries, label):
+    lines = [f"{label} ran {counter.count} queries, budget is {max_queries}:"]
+    lines.extend(f"  {index}. {sql}" for index, sql in enumerate(counter.queries, start=1))
+    if counter.cache_count:
+        lines.append(f"plus {counter.cache_count} database cache queries:")
+        lines.extend(f"  - {sql}" for sql in counter.cache_queries)
+    return "\n".join(lines)
+
+
+class QueryBudgetMiddleware:
+    """Development middleware that enforces the budgets declared on views"""
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'QUERY_BUDGET_MODE', '')
+        if self.mode not in ('warn', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+
+        max_queries = getattr(request, '_query_budget', None)
+        if max_queries is not None and counter.count > max_queries:
+            report = format_report(counter, max_queries, f"{request.method} {request.path}")
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(report)
+            logger.warning(report)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_view_budget(view_func)
+        return None
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -56,6 +57,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so request latency covers the other middleware too
+    'backend.metrics.MetricsMiddleware',
+    # Writes the request's external API calls to the usage ledger
+    'places.api_budget.ApiLedgerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -65,8 +70,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Inactive unless QUERY_BUDGET_MODE is set; keep last so only view queries are counted
+    'backend.query_budget.QueryBudgetMiddleware',
 ]
 
+# Per-view query budgets: '' (off), 'warn' (log overruns) or 'raise' (fail the request)
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', '')
+
+# Request metrics: bearer token required by /metrics (closed when empty,
+# unless DEBUG), and
+# whether responses carry a Server-Timing header
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'False').lower() in ('true', '1', 'yes')
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -108,21 +124,69 @@ else:
         }
     }
 
+# Cache shared by every worker process (token state, user payloads, rate
+# limit buckets). Production should use Redis or Memcached, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and
+# CACHE_LOCATION=redis://localhost:6379/1 (needs the redis package); the
+# database cache default (backend/caching.py, table created by migration
+# authentication 0006) is for development, and `check --deploy` warns about
+# it. MAX_ENTRIES covers a few keys per active user plus the rate limit
+# buckets; past it the database cache deletes 1/CULL_FREQUENCY of the keys.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'backend.caching.DatabaseCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'django_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+            'CULL_FREQUENCY': int(os.getenv('CACHE_CULL_FREQUENCY', 10)),
+        },
+    }
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.tokens.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'backend.throttling.TokenBucketThrottle',
+    ],
+}
+
+# Token buckets per scope (see backend/throttling.py): capacity is the burst
+# size in tokens, refill is tokens per second. Views set throttle_scope and
+# throttle_cost.
+RATE_LIMITS = {
+    'anon': {'capacity': 60, 'refill': 1},
+    'user': {'capacity': 120, 'refill': 2},
+    # Signup, login and OTP endpoints, per IP address
+    'auth': {'capacity': 10, 'refill': 1 / 30},
 }
+RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', 'backend.throttling.CacheBucketStorage')
+
+# Billed external API calls allowed per day, by "service.operation" (see
+# places/api_budget.py). Past a budget, views serve stored data only.
+API_DAILY_BUDGETS = {
+    'google_places.search': int(os.getenv('GOOGLE_SEARCH_DAILY_BUDGET', 1000)),
+    'google_places.details': int(os.getenv('GOOGLE_DETAILS_DAILY_BUDGET', 2000)),
+    # Photo URLs handed out with place details (up to 5 per place)
+    'google_places.photo': int(os.getenv('GOOGLE_PHOTO_DAILY_BUDGET', 5000)),
+    'openweather.onecall': int(os.getenv('OPENWEATHER_DAILY_BUDGET', 1000)),
+}
+# Share of each budget background work (feed warm-ups) may use
+API_BUDGET_BACKGROUND_SHARE = 0.8
 
 SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(days=7),  # Set to 7 days or your desired time
+    # Read requests trust the claims of access tokens, so keep them short-lived;
+    # clients get new ones from /api/token/refresh/
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.tokens.ClaimsTokenRefreshSerializer',
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
 
@@ -170,6 +234,16 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Local host document uploads: accepted types with their size caps (bytes),
+# where partial chunked uploads are assembled, and the suggested chunk size
+DOCUMENT_UPLOAD_MAX_SIZES = {
+    'image/jpeg': 10 * 1024 * 1024,
+    'image/png': 10 * 1024 * 1024,
+    'application/pdf': 20 * 1024 * 1024,
+}
+DOCUMENT_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'uploads' / 'partial'
+DOCUMENT_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,170 @@
+"""
+Token-bucket rate limiting
+
+Every client has a bucket per scope that holds up to ``capacity`` tokens and
+refills at ``refill`` tokens per second. A request takes ``throttle_cost``
+tokens from its view's ``throttle_scope`` bucket, so expensive endpoints
+(e.g. the places list, which calls Google) drain it faster than cheap reads.
+When the bucket is short, DRF answers 429 with a ``Retry-After`` header, from
+``check_throttles()``, before the view handler runs.
+
+Scopes are configured in ``settings.RATE_LIMITS``. Buckets are kept by the
+storage class named in ``settings.RATE_LIMIT_STORAGE``:
+
+* ``LocalBucketStorage`` - in-process; limits apply per worker process
+* ``CacheBucketStorage`` - Django's cache; shared by every process. It needs
+  Redis or Memcached as the default cache: on the database cache each request
+  would cost several queries, so get_storage() falls back to
+  ``LocalBucketStorage`` there, and with a per-process cache, and says so.
+"""
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from .caching import shared_cache_available
+
+logger = logging.getLogger(__name__)
+
+ANON_SCOPE = 'anon'
+USER_SCOPE = 'user'
+
+
+class TokenBucket:
+    """Refill/take arithmetic; state is a (tokens, updated_at) tuple"""
+
+    def __init__(self, capacity, refill):
+        self.capacity = capacity
+        self.refill = refill
+
+    def take(self, state, cost, now):
+        """Returns (new state, allowed, seconds until cost tokens are available)"""
+        tokens, updated_at = state if state else (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill)
+        # A cost above the capacity could never be paid
+        cost = min(cost, self.capacity)
+        if tokens >= cost:
+            return (tokens - cost, now), True, 0
+        return (tokens, now), False, (cost - tokens) / self.refill
+
+    def idle_timeout(self):
+        """Seconds after which an untouched bucket is full again"""
+        return math.ceil(self.capacity / self.refill) + 1
+
+
+class LocalBucketStorage:
+    """Buckets in a dict of this process"""
+
+    # Full buckets are pruned once this many clients are tracked
+    MAX_BUCKETS = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.states = {}
+
+    def take(self, key, bucket, cost):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.states) >= self.MAX_BUCKETS:
+                self.prune(now)
+            stored = self.states.get(key)
+            state, allowed, wait = bucket.take(stored[0] if stored else None, cost, now)
+            # Kept with the time the bucket will be full again, for pruning
+            self.states[key] = (state, now + bucket.idle_timeout())
+        return allowed, wait
+
+    def prune(self, now):
+        self.states = {key: value for key, value in self.states.items() if value[1] > now}
+
+
+class CacheBucketStorage:
+    """
+    Buckets in Django's cache, shared between processes. Each update holds a
+    per-bucket lock taken with cache.add(), so concurrent requests of one
+    client are metered one after the other. A request that can't get the
+    lock after a few short waits is refused.
+    """
+
+    # A lock left by a crashed worker expires after this many seconds
+    LOCK_TIMEOUT = 2
+    LOCK_ATTEMPTS = 5
+    LOCK_WAIT = 0.01
+
+    @staticmethod
+    def usable():
+        """Whether the default cache is shared and kept in memory (Redis, Memcached)"""
+        return shared_cache_available() and not isinstance(caches['default'], DatabaseCache)
+
+    def take(self, key, bucket, cost):
+        cache_key = f'rate_limit:{key}'
+        lock_key = f'{cache_key}:lock'
+        if not self.acquire(lock_key):
+            return False, self.LOCK_TIMEOUT
+        try:
+            now = time.time()
+            state, allowed, wait = bucket.take(cache.get(cache_key), cost, now)
+            cache.set(cache_key, state, bucket.idle_timeout())
+        finally:
+            cache.delete(lock_key)
+        return allowed, wait
+
+    def acquire(self, lock_key):
+        for attempt in range(self.LOCK_ATTEMPTS):
+            if cache.add(lock_key, 1, self.LOCK_TIMEOUT):
+                return True
+            time.sleep(self.LOCK_WAIT * (attempt + 1))
+        return False
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        storage_class = import_string(settings.RATE_LIMIT_STORAGE)
+        if issubclass(storage_class, CacheBucketStorage) and not storage_class.usable():
+            logger.warning(
+                "%s needs Redis or Memcached as the default cache; using LocalBucketStorage, "
+                "so rate limits apply per process",
+                settings.RATE_LIMIT_STORAGE,
+            )
+            storage_class = LocalBucketStorage
+        _storage = storage_class()
+    return _storage
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by token buckets. Views choose their bucket with
+    ``throttle_scope`` (default: 'user' or 'anon') and their price with
+    ``throttle_cost`` (default 1). Clients are identified by user id when
+    authenticated and by IP address otherwise.
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def allow_request(self, request, view):
+        authenticated = request.user and request.user.is_authenticated
+        scope = getattr(view, 'throttle_scope', None) or (USER_SCOPE if authenticated else ANON_SCOPE)
+        config = settings.RATE_LIMITS.get(scope)
+        if config is None:
+            return True
+
+        ident = f'user:{request.user.pk}' if authenticated else f'ip:{self.get_ident(request)}'
+        bucket = TokenBucket(config['capacity'], config['refill'])
+        cost = getattr(view, 'throttle_cost', 1)
+
+        allowed, wait = get_storage().take(f'{scope}:{ident}', bucket, cost)
+        self.retry_after = wait
+        return allowed
+
+    def wait(self):
+        return self.retry_after
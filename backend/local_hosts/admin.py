@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import LocalHost, LocalHostDocument, LocalHostReview, LocalHostBooking
+from . import matching
 
 
 @admin.register(LocalHost)
@@ -11,12 +12,15 @@ class LocalHostAdmin(admin.ModelAdmin):
     ]
     list_filter = ['status', 'services_offered', 'application_date', 'created_at']
     search_fields = ['full_name', 'user__username', 'user__email', 'phone_number']
-    readonly_fields = ['user', 'application_date', 'created_at', 'updated_at']
+    readonly_fields = ['user', 'location_source', 'geohash', 'application_date', 'created_at', 'updated_at']
     
     fieldsets = (
         ('User Information', {
             'fields': ('user', 'full_name', 'age', 'phone_number', 'address')
         }),
+        ('Location', {
+            'fields': ('latitude', 'longitude', 'location_source', 'geohash')
+        }),
         ('Identity Documents', {
             'fields': ('aadhaar_number', 'pan_number', 'documents_provided')
         }),
@@ -39,6 +43,10 @@ class LocalHostAdmin(admin.ModelAdmin):
     
     actions = ['approve_applications', 'reject_applications', 'mark_under_review']
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        matching.refresh_host(obj)
+    
     def services_display(self, obj):
         """Display services in a readable format"""
         return ', '.join(obj.service_names[:3]) + ('...' if len(obj.service_names) > 3 else '')
@@ -47,18 +55,21 @@ class LocalHostAdmin(admin.ModelAdmin):
     def approve_applications(self, request, queryset):
         """Approve selected applications"""
         count = queryset.update(status='APPROVED')
+        matching.refresh_hosts(queryset)
         self.message_user(request, f'{count} applications approved.')
     approve_applications.short_description = 'Approve selected applications'
     
     def reject_applications(self, request, queryset):
         """Reject selected applications"""
         count = queryset.update(status='REJECTED')
+        matching.refresh_hosts(queryset)
         self.message_user(request, f'{count} applications rejected.')
     reject_applications.short_description = 'Reject selected applications'
     
     def mark_under_review(self, request, queryset):
         """Mark applications as under review"""
         count = queryset.update(status='UNDER_REVIEW')
+        matching.refresh_hosts(queryset)
         self.message_user(request, f'{count} applications marked as under review.')
     mark_under_review.short_description = 'Mark as under review'
 
@@ -67,11 +78,41 @@ class LocalHostAdmin(admin.ModelAdmin):
 class LocalHostDocumentAdmin(admin.ModelAdmin):
     list_display = [
         'local_host', 'document_type', 'uploaded_at', 
-        'is_verified', 'verification_status'
+        'is_verified', 'verification_status', 'processing_status', 'preview_thumbnail'
     ]
-    list_filter = ['document_type', 'is_verified', 'uploaded_at']
+    list_filter = ['document_type', 'is_verified', 'processing_status', 'uploaded_at']
     search_fields = ['local_host__full_name', 'local_host__user__username']
-    readonly_fields = ['uploaded_at']
+    list_select_related = ['local_host']
+    readonly_fields = [
+        'uploaded_at', 'preview_image', 'content_hash', 'content_type', 'file_size',
+        'processing_status', 'processed_at', 'processing_error', 'metadata'
+    ]
+    actions = ['reprocess_documents']
+    
+    def preview_thumbnail(self, obj):
+        """Small preview for the change list; the full scan is only loaded on demand"""
+        if obj.preview:
+            return format_html('<img src="{}" style="max-height: 60px;" loading="lazy">', obj.preview.url)
+        return '-'
+    preview_thumbnail.short_description = 'Preview'
+    
+    def preview_image(self, obj):
+        """Compressed preview linking to the original upload"""
+        if obj.preview:
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" style="max-width: 800px;"></a>',
+                obj.document_file.url, obj.preview.url
+            )
+        if obj.document_file:
+            return format_html('No preview available. <a href="{}" target="_blank">Open the original</a>', obj.document_file.url)
+        return 'No preview available'
+    preview_image.short_description = 'Preview'
+    
+    def reprocess_documents(self, request, queryset):
+        """Queue selected documents for processing again"""
+        count = queryset.update(processing_status='PENDING', processing_started_at=None)
+        self.message_user(request, f'{count} documents queued for processing.')
+    reprocess_documents.short_description = 'Reprocess selected documents'
     
     def verification_status(self, obj):
         """Display verification status with color"""
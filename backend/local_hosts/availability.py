@@ -0,0 +1,62 @@
+"""
+Booking availability for local hosts
+Answers "is the host free" and "when is the host free" from only the bookings
+that overlap the requested dates. The lookups seek on the
+(local_host, service_type, end_date) index, and overlapping writes are
+rejected by the exclusion constraint on LocalHostBooking.
+"""
+from datetime import timedelta
+
+from .models import LocalHostBooking, ACTIVE_BOOKING_STATUSES
+
+# Longest date range the availability endpoint will scan
+MAX_WINDOW_DAYS = 366
+
+ONE_DAY = timedelta(days=1)
+
+
+def overlapping_bookings(local_host, start_date, end_date, service_type=None, exclude_id=None):
+    """Active bookings of a host that share at least one day with [start_date, end_date]"""
+    queryset = LocalHostBooking.objects.filter(
+        local_host=local_host,
+        status__in=ACTIVE_BOOKING_STATUSES,
+        end_date__gte=start_date,
+        start_date__lte=end_date,
+    )
+    if service_type:
+        queryset = queryset.filter(service_type=service_type)
+    if exclude_id is not None:
+        queryset = queryset.exclude(pk=exclude_id)
+    return queryset
+
+
+def is_available(local_host, start_date, end_date, service_type=None, exclude_id=None):
+    """Check whether the host has no active booking on any of the given days"""
+    return not overlapping_bookings(
+        local_host, start_date, end_date, service_type, exclude_id
+    ).exists()
+
+
+def free_windows(local_host, start_date, end_date, service_type=None):
+    """
+    List the free (start, end) date windows, both inclusive, between two dates.
+    Without a service type, a day is free only if no service is booked on it.
+    """
+    busy = (
+        overlapping_bookings(local_host, start_date, end_date, service_type)
+        .order_by('start_date')
+        .values_list('start_date', 'end_date')
+    )
+
+    windows = []
+    cursor = start_date
+    for booked_from, booked_to in busy:
+        if booked_from > cursor:
+            windows.append((cursor, booked_from - ONE_DAY))
+        cursor = max(cursor, booked_to + ONE_DAY)
+        if cursor > end_date:
+            break
+
+    if cursor <= end_date:
+        windows.append((cursor, end_date))
+    return windows
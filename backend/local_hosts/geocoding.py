@@ -0,0 +1,126 @@
+"""
+Offline geocoding for local host addresses
+Resolves a free-text address against a local gazetteer, so no external
+geocoding API is needed. Towns and localities give a usable location; an
+address that only names a district can just be placed at the district's
+centre, which is too coarse for distance ranking (see LocalHost.save()).
+Hosts can always override the result by entering coordinates manually.
+"""
+import re
+from typing import Optional, Tuple
+
+from preferences.catalog import get_catalog
+
+# Town/locality centres (latitude, longitude). District headquarters that
+# share the district's name are left out: an address naming e.g. "Kottayam"
+# may mean the district as much as the town.
+LOCALITIES = {
+    'fort kochi': (9.9658, 76.2421),
+    'mattancherry': (9.9582, 76.2595),
+    'kochi': (9.9312, 76.2673),
+    'cochin': (9.9312, 76.2673),
+    'aluva': (10.1004, 76.3570),
+    'perumbavoor': (10.1158, 76.4770),
+    'kothamangalam': (10.0602, 76.6351),
+    'muvattupuzha': (9.9894, 76.5790),
+    'angamaly': (10.1960, 76.3860),
+    'kovalam': (8.4004, 76.9787),
+    'varkala': (8.7379, 76.7163),
+    'attingal': (8.6963, 76.8150),
+    'neyyattinkara': (8.4000, 77.0833),
+    'ponmudi': (8.7600, 77.1160),
+    'karunagappally': (9.0600, 76.5350),
+    'punalur': (9.0170, 76.9260),
+    'adoor': (9.1550, 76.7350),
+    'thiruvalla': (9.3835, 76.5741),
+    'ranni': (9.3860, 76.7850),
+    'cherthala': (9.6840, 76.3360),
+    'kayamkulam': (9.1748, 76.5013),
+    'haripad': (9.2840, 76.4570),
+    'mararikulam': (9.6010, 76.3000),
+    'kumarakom': (9.6175, 76.4301),
+    'changanassery': (9.4442, 76.5413),
+    'pala': (9.7133, 76.6830),
+    'vaikom': (9.7490, 76.3930),
+    'erattupetta': (9.6870, 76.7790),
+    'munnar': (10.0889, 77.0595),
+    'thekkady': (9.6031, 77.1615),
+    'kumily': (9.6091, 77.1683),
+    'vagamon': (9.6862, 76.9052),
+    'thodupuzha': (9.8959, 76.7184),
+    'painavu': (9.8470, 76.9440),
+    'kattappana': (9.7490, 77.1150),
+    'adimali': (10.0140, 76.9510),
+    'guruvayur': (10.5946, 76.0369),
+    'chalakudy': (10.3070, 76.3340),
+    'kodungallur': (10.2333, 76.2000),
+    'irinjalakuda': (10.3420, 76.2110),
+    'athirappilly': (10.2850, 76.5700),
+    'ottapalam': (10.7700, 76.3770),
+    'shoranur': (10.7600, 76.2710),
+    'nelliyampathy': (10.5350, 76.6930),
+    'mannarkkad': (10.9930, 76.4610),
+    'manjeri': (11.1200, 76.1200),
+    'tirur': (10.9140, 75.9210),
+    'ponnani': (10.7700, 75.9250),
+    'nilambur': (11.2855, 76.2386),
+    'perinthalmanna': (10.9760, 76.2250),
+    'calicut': (11.2588, 75.7804),
+    'vadakara': (11.6094, 75.5917),
+    'koyilandy': (11.4390, 75.6950),
+    'beypore': (11.1720, 75.8060),
+    'kalpetta': (11.6085, 76.0830),
+    'sulthan bathery': (11.6634, 76.2566),
+    'mananthavady': (11.8014, 76.0044),
+    'vythiri': (11.5530, 76.0400),
+    'thalassery': (11.7491, 75.4890),
+    'payyanur': (12.1000, 75.2000),
+    'taliparamba': (12.0380, 75.3600),
+    'bekal': (12.3917, 75.0333),
+    'kanhangad': (12.3080, 75.0960),
+    'nileshwar': (12.2570, 75.1350),
+}
+
+# Common alternative spellings of district names found in addresses
+DISTRICT_ALIASES = {
+    'TVM': ['trivandrum'],
+    'KLM': ['quilon'],
+    'ALP': ['alleppey'],
+    'TSR': ['trichur'],
+    'PLK': ['palghat'],
+    'KNR': ['cannanore'],
+}
+
+# Location sources (LocalHost.location_source) of the two gazetteer levels
+LOCALITY_SOURCE = 'GAZETTEER'
+DISTRICT_SOURCE = 'DISTRICT'
+
+
+def mentions(text: str, name: str) -> bool:
+    return re.search(rf'\b{re.escape(name)}\b', text) is not None
+
+
+def geocode_address(address: str) -> Optional[Tuple[float, float, str]]:
+    """
+    Return (latitude, longitude, source) for an address, or None if no
+    gazetteer entry is mentioned in it. source is LOCALITY_SOURCE for a town
+    or locality, and DISTRICT_SOURCE when only a district is named (its
+    centre is used then).
+    """
+    if not address:
+        return None
+
+    text = address.lower()
+    # Longest names first, so "fort kochi" wins over "kochi"
+    for name in sorted(LOCALITIES, key=len, reverse=True):
+        if mentions(text, name):
+            latitude, longitude = LOCALITIES[name]
+            return latitude, longitude, LOCALITY_SOURCE
+
+    for district in get_catalog('districts').rows:
+        names = [district.name.lower()] + DISTRICT_ALIASES.get(district.code, [])
+        if any(mentions(text, name) for name in names):
+            latitude, longitude = district.centroid()
+            return latitude, longitude, DISTRICT_SOURCE
+
+    return None
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from local_hosts import matching
+from local_hosts.models import LocalHost
+
+
+class Command(BaseCommand):
+    help = "Resolve coordinates for local hosts that don't have any yet, using the offline gazetteer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--regeocode', action='store_true',
+                            help="Also resolve again the hosts located from their address "
+                                 "(e.g. after the gazetteer gained towns)")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = LocalHost.objects.filter(latitude__isnull=True).exclude(address='')
+        if options['regeocode']:
+            queryset = LocalHost.objects.filter(location_source__in=['GAZETTEER', 'DISTRICT']).exclude(address='')
+
+        located = 0
+        coarse = 0
+        missing = 0
+        for local_host in queryset.iterator(chunk_size=batch_size):
+            moved_from = (local_host.latitude, local_host.longitude, local_host.location_source)
+            # save() geocodes hosts without coordinates and fills the geohash
+            local_host.latitude = local_host.longitude = None
+            local_host.location_source = ''
+            local_host.save(update_fields=['latitude', 'longitude'])
+            if (local_host.latitude, local_host.longitude, local_host.location_source) != moved_from:
+                matching.refresh_host(local_host)
+
+            if local_host.location_source == 'GAZETTEER':
+                located += 1
+            elif local_host.location_source == 'DISTRICT':
+                coarse += 1
+            else:
+                missing += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Located {located} local hosts; {coarse} only to their district (not used for distance); "
+            f"{missing} addresses not found in the gazetteer."
+        ))
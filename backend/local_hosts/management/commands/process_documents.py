@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from local_hosts.processing import process_pending
+
+
+class Command(BaseCommand):
+    help = "Process uploaded local host documents: checksums, metadata and preview images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling for new documents instead of exiting when none are left")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to wait between polls when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        total_processed = total_failed = 0
+        while True:
+            processed, failed = process_pending(options['batch_size'])
+            total_processed += processed
+            total_failed += failed
+
+            if processed or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {total_processed} documents; {total_failed} failed."
+        ))
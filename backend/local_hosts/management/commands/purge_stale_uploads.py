@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from local_hosts import uploads
+from local_hosts.models import LocalHostDocumentUpload
+
+
+class Command(BaseCommand):
+    help = "Delete resumable document uploads that were abandoned before completion"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help="Age (since the last chunk) after which an upload is abandoned")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = LocalHostDocumentUpload.objects.filter(status='IN_PROGRESS', updated_at__lt=cutoff)
+
+        count = 0
+        for upload in stale.iterator():
+            uploads.discard_part(upload)
+            upload.delete()
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} abandoned uploads."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from local_hosts import matching
+from local_hosts.models import LocalHost
+
+
+class Command(BaseCommand):
+    help = "Rebuild the place <-> local host matching index from scratch"
+
+    def handle(self, *args, **options):
+        # Refreshing every host also drops the matches of hosts no longer approved
+        count = matching.refresh_hosts(LocalHost.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} place/host matches."))
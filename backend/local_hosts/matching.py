@@ -0,0 +1,115 @@
+"""
+Place <-> local host matching index
+Keeps PlaceHostMatch up to date one place or one host at a time, so the
+table never needs a full rebuild after the initial backfill
+(see the rebuild_place_host_matches command).
+"""
+import math
+
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+
+from places.models import Place
+from services import geo
+from .models import LocalHost, PlaceHostMatch
+
+# Hosts further than this from a place are not matched with it
+MATCH_RADIUS_KM = 25
+
+# How the score is weighted between its components (sums to 1)
+DISTANCE_WEIGHT = 0.5
+SERVICES_WEIGHT = 0.2
+RATING_WEIGHT = 0.3
+
+# Number of services at which the services component saturates
+SERVICES_SATURATION = 4
+
+# Unrated hosts are treated as having this many reviews of this rating
+RATING_PRIOR_COUNT = 3
+RATING_PRIOR_MEAN = 3.5
+
+
+def host_score(distance_km, services_count, average_rating, review_count):
+    """Score in [0, 1] for a host at a given distance from a place"""
+    closeness = max(0.0, 1 - distance_km / MATCH_RADIUS_KM)
+    services = min(services_count, SERVICES_SATURATION) / SERVICES_SATURATION
+
+    # Shrink the average towards the prior so one 5-star review doesn't dominate
+    total = (average_rating or 0) * review_count + RATING_PRIOR_MEAN * RATING_PRIOR_COUNT
+    rating = total / (review_count + RATING_PRIOR_COUNT) / 5
+
+    return DISTANCE_WEIGHT * closeness + SERVICES_WEIGHT * services + RATING_WEIGHT * rating
+
+
+def matchable_hosts():
+    """Approved hosts with a precise enough location, annotated with their rating"""
+    return (
+        LocalHost.objects.filter(status='APPROVED', latitude__isnull=False, longitude__isnull=False)
+        .exclude(location_source='DISTRICT')
+        .annotate(average_rating_value=Avg('reviews__rating'), review_count_value=Count('reviews'))
+        .only('id', 'latitude', 'longitude', 'services_offered')
+    )
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(south, west, north, east) box enclosing a circle around a point"""
+    lat_delta = math.degrees(radius_km / geo.EARTH_RADIUS_KM)
+    lng_delta = lat_delta / max(math.cos(math.radians(latitude)), 0.01)
+    return latitude - lat_delta, longitude - lng_delta, latitude + lat_delta, longitude + lng_delta
+
+
+def build_match(place, host):
+    distance = geo.haversine_km(place.latitude, place.longitude, host.latitude, host.longitude)
+    if distance > MATCH_RADIUS_KM:
+        return None
+    score = host_score(
+        distance, len(host.services_offered or []),
+        host.average_rating_value, host.review_count_value,
+    )
+    return PlaceHostMatch(place=place, local_host=host, distance_km=distance, score=score)
+
+
+def refresh_place(place):
+    """Recompute the matches of one place, e.g. after it was added or moved"""
+    if not place.latitude and not place.longitude:
+        return 0
+
+    precision = geo.geohash_precision_for_radius(MATCH_RADIUS_KM, place.latitude)
+    cells = geo.geohash_neighbors(geo.geohash_encode(place.latitude, place.longitude, precision))
+    in_cells = Q()
+    for cell in cells:
+        in_cells |= Q(geohash__startswith=cell)
+
+    matches = [m for m in (build_match(place, host) for host in matchable_hosts().filter(in_cells)) if m]
+    with transaction.atomic():
+        PlaceHostMatch.objects.filter(place=place).delete()
+        PlaceHostMatch.objects.bulk_create(matches)
+    return len(matches)
+
+
+def refresh_host(local_host):
+    """
+    Recompute the matches of one host, e.g. after it was approved, suspended,
+    moved, changed its services or received a review
+    """
+    host = matchable_hosts().filter(pk=local_host.pk).first()
+
+    matches = []
+    if host is not None:
+        south, west, north, east = bounding_box(host.latitude, host.longitude, MATCH_RADIUS_KM)
+        places = Place.objects.filter(
+            is_active=True,
+            latitude__range=(south, north),
+            longitude__range=(west, east),
+        ).only('id', 'latitude', 'longitude')
+        matches = [m for m in (build_match(place, host) for place in places) if m]
+
+    with transaction.atomic():
+        PlaceHostMatch.objects.filter(local_host=local_host).delete()
+        PlaceHostMatch.objects.bulk_create(matches)
+    return len(matches)
+
+
+def refresh_hosts(queryset):
+    """Refresh the matches of every host in a queryset"""
+    return sum(refresh_host(local_host) for local_host in queryset.only('pk'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('local_hosts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='localhost',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='local_host_status_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='localhostbooking',
+            index=models.Index(fields=['traveler', '-created_at', 'id'], name='booking_traveler_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='localhostbooking',
+            index=models.Index(fields=['local_host', '-created_at', 'id'], name='booking_host_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('local_hosts', '0002_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='localhostreview',
+            index=models.Index(fields=['local_host', '-created_at', 'id'], name='review_host_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:42
+
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+import local_hosts.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('local_hosts', '0003_review_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Needed for the '=' members of the exclusion constraint
+        BtreeGistExtension(),
+        migrations.AddIndex(
+            model_name='localhostbooking',
+            index=models.Index(fields=['local_host', 'service_type', 'end_date'], name='booking_host_calendar_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='localhostbooking',
+            constraint=models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='booking_end_after_start'),
+        ),
+        migrations.AddConstraint(
+            model_name='localhostbooking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ['PENDING', 'CONFIRMED'])), expressions=[(local_hosts.models.DateRange('start_date', 'end_date'), '&&'), ('local_host', '='), ('service_type', '=')], name='booking_no_overlap_per_host_service', violation_error_message='The host is already booked for this service on these dates.'),
+        ),
+    ]
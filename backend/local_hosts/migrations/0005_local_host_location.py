@@ -0,0 +1,40 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:44
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('local_hosts', '0004_booking_availability_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localhost',
+            name='geohash',
+            field=models.CharField(blank=True, help_text='Geohash of the coordinates, for proximity search', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='localhost',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='localhost',
+            name='location_source',
+            field=models.CharField(blank=True, choices=[('MANUAL', 'Entered by host'), ('GAZETTEER', 'Resolved from address')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='localhost',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='localhost',
+            index=models.Index(fields=['status', 'geohash'], name='local_host_geohash_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('local_hosts', '0006_document_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localhostdocument',
+            name='metadata',
+            field=models.JSONField(blank=True, default=dict, help_text='Extracted file metadata'),
+        ),
+        migrations.AddField(
+            model_name='localhostdocument',
+            name='preview',
+            field=models.FileField(blank=True, upload_to='local_host_documents/previews/'),
+        ),
+        migrations.AddField(
+            model_name='localhostdocument',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='localhostdocument',
+            name='processing_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='localhostdocument',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='localhostdocument',
+            name='processing_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='localhostdocument',
+            index=models.Index(fields=['processing_status', 'uploaded_at'], name='document_processing_idx'),
+        ),
+    ]
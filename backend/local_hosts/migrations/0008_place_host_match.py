@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('local_hosts', '0007_document_processing'),
+        ('places', '0003_place_location_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceHostMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField()),
+                ('score', models.FloatField(help_text='Higher is better; combines distance, services and rating')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('local_host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='place_matches', to='local_hosts.localhost')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='host_matches', to='places.place')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['place', '-score'], name='place_host_match_score_idx')],
+                'unique_together': {('place', 'local_host')},
+            },
+        ),
+    ]
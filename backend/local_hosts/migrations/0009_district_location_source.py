@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:23
+
+from django.db import migrations, models
+
+
+def downgrade_centroid_locations(apps, schema_editor):
+    """
+    Hosts located from their address so far all got their district's centre:
+    mark them as such and drop them from the proximity index and the matches.
+    geocode_local_hosts --regeocode resolves them again against the towns.
+    """
+    LocalHost = apps.get_model('local_hosts', 'LocalHost')
+    PlaceHostMatch = apps.get_model('local_hosts', 'PlaceHostMatch')
+    hosts = LocalHost.objects.filter(location_source='GAZETTEER')
+    PlaceHostMatch.objects.filter(local_host__in=hosts).delete()
+    hosts.update(location_source='DISTRICT', geohash='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('local_hosts', '0008_place_host_match'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='localhost',
+            name='location_source',
+            field=models.CharField(blank=True, choices=[('MANUAL', 'Entered by host'), ('GAZETTEER', 'Resolved from address'), ('DISTRICT', 'District centre only')], max_length=20),
+        ),
+        migrations.RunPython(downgrade_centroid_locations, migrations.RunPython.noop),
+    ]
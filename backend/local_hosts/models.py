@@ -1,6 +1,21 @@
 from django.db import models
+import uuid
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeBoundary, RangeOperators
+
+from services.geo import geohash_encode
+from .geocoding import geocode_address
+
+class DateRange(models.Func):
+    """Inclusive daterange built from a pair of date columns"""
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+    
+    def __init__(self, start, end):
+        super().__init__(start, end, RangeBoundary(inclusive_lower=True, inclusive_upper=True))
+
 
 class LocalHost(models.Model):
     """Model for local host applications and profiles"""
@@ -25,6 +40,14 @@ class LocalHost(models.Model):
         ('OTHER', 'Other Services'),
     ]
     
+    # How the host's coordinates were obtained
+    LOCATION_SOURCE_CHOICES = [
+        ('MANUAL', 'Entered by host'),
+        ('GAZETTEER', 'Resolved from address'),
+        # Too coarse for distance ranking: no geohash, not matched with places
+        ('DISTRICT', 'District centre only'),
+    ]
+    
     # Document type choices
     DOCUMENT_CHOICES = [
         ('AADHAAR', 'Aadhaar Card'),
@@ -40,6 +63,18 @@ class LocalHost(models.Model):
     age = models.PositiveIntegerField(validators=[MinValueValidator(18), MaxValueValidator(100)])
     address = models.TextField()
     
+    # Location (geocoded once from the address, or entered manually)
+    latitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geohash = models.CharField(max_length=12, blank=True, help_text="Geohash of the coordinates, for proximity search")
+    location_source = models.CharField(max_length=20, choices=LOCATION_SOURCE_CHOICES, blank=True)
+    
     # Contact Information
     phone_number = models.CharField(
         max_length=15,
@@ -81,10 +116,39 @@ class LocalHost(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Local Host'
         verbose_name_plural = 'Local Hosts'
+        indexes = [
+            # Keyset pagination of the public list
+            models.Index(fields=['status', '-created_at', 'id'], name='local_host_status_keyset_idx'),
+            # Proximity search by geohash prefix
+            models.Index(
+                fields=['status', 'geohash'], name='local_host_geohash_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops'],
+            ),
+        ]
     
     def __str__(self):
         return f"{self.full_name} - {self.get_status_display()}"
     
+    def save(self, *args, **kwargs):
+        if (self.latitude is None or self.longitude is None) and self.address:
+            location = geocode_address(self.address)
+            if location:
+                self.latitude, self.longitude, self.location_source = location
+        
+        if self.latitude is not None and self.longitude is not None:
+            if not self.location_source:
+                self.location_source = 'MANUAL'
+            # Left out of the geohash index, so proximity queries skip the host
+            self.geohash = '' if self.location_source == 'DISTRICT' else geohash_encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+            self.location_source = ''
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude', 'address'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'latitude', 'longitude', 'geohash', 'location_source'}
+        super().save(*args, **kwargs)
+    
     @property
     def is_approved(self):
         return self.status == 'APPROVED'
@@ -99,21 +163,78 @@ class LocalHost(models.Model):
 class LocalHostDocument(models.Model):
     """Model for storing uploaded verification documents"""
     
+    PROCESSING_STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    
     local_host = models.ForeignKey(LocalHost, on_delete=models.CASCADE, related_name='uploaded_documents')
     document_type = models.CharField(max_length=20, choices=LocalHost.DOCUMENT_CHOICES)
     document_file = models.FileField(upload_to='local_host_documents/')
+    # Files are stored under their SHA-256, so identical uploads share one file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_verified = models.BooleanField(default=False)
     verification_notes = models.TextField(blank=True, null=True)
     
+    # Background processing (see local_hosts/processing.py)
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUS_CHOICES, default='PENDING')
+    processing_started_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    processing_error = models.TextField(blank=True)
+    preview = models.FileField(upload_to='local_host_documents/previews/', blank=True)
+    metadata = models.JSONField(default=dict, blank=True, help_text="Extracted file metadata")
+    
     class Meta:
         unique_together = ['local_host', 'document_type']
         ordering = ['-uploaded_at']
+        indexes = [
+            # Workers pick up documents by status in upload order
+            models.Index(fields=['processing_status', 'uploaded_at'], name='document_processing_idx'),
+        ]
     
     def __str__(self):
         return f"{self.local_host.full_name} - {self.get_document_type_display()}"
 
 
+class LocalHostDocumentUpload(models.Model):
+    """A resumable, chunked upload of a verification document"""
+    
+    STATUS_CHOICES = [
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETE', 'Complete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    local_host = models.ForeignKey(LocalHost, on_delete=models.CASCADE, related_name='document_uploads')
+    document_type = models.CharField(max_length=20, choices=LocalHost.DOCUMENT_CHOICES)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='IN_PROGRESS')
+    document = models.ForeignKey(
+        LocalHostDocument, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+    
+    @property
+    def is_complete(self):
+        return self.status == 'COMPLETE'
+
+
 class LocalHostReview(models.Model):
     """Model for reviews/ratings of local hosts by travelers"""
     
@@ -129,11 +250,19 @@ class LocalHostReview(models.Model):
     class Meta:
         unique_together = ['local_host', 'reviewer', 'service_type']
         ordering = ['-created_at']
+        indexes = [
+            # Latest reviews of a host, walked with keyset pagination
+            models.Index(fields=['local_host', '-created_at', 'id'], name='review_host_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.reviewer.username} -> {self.local_host.full_name} ({self.rating}/5)"
 
 
+# Bookings in these states hold the host's calendar
+ACTIVE_BOOKING_STATUSES = ['PENDING', 'CONFIRMED']
+
+
 class LocalHostBooking(models.Model):
     """Model for tracking bookings/inquiries to local hosts"""
     
@@ -144,6 +273,8 @@ class LocalHostBooking(models.Model):
         ('COMPLETED', 'Completed'),
     ]
     
+    ACTIVE_STATUSES = ACTIVE_BOOKING_STATUSES
+    
     local_host = models.ForeignKey(LocalHost, on_delete=models.CASCADE, related_name='bookings')
     traveler = models.ForeignKey(User, on_delete=models.CASCADE, related_name='local_host_bookings')
     service_type = models.CharField(max_length=20, choices=LocalHost.SERVICE_CHOICES)
@@ -171,6 +302,55 @@ class LocalHostBooking(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a traveler's and a host's bookings
+            models.Index(fields=['traveler', '-created_at', 'id'], name='booking_traveler_keyset_idx'),
+            models.Index(fields=['local_host', '-created_at', 'id'], name='booking_host_keyset_idx'),
+            # Availability lookups seek on bookings that end after a given date
+            models.Index(fields=['local_host', 'service_type', 'end_date'], name='booking_host_calendar_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__gte=models.F('start_date')),
+                name='booking_end_after_start',
+            ),
+            # A host can't hold two active bookings for the same service on
+            # overlapping dates; backed by a GiST index
+            ExclusionConstraint(
+                name='booking_no_overlap_per_host_service',
+                expressions=[
+                    (DateRange('start_date', 'end_date'), RangeOperators.OVERLAPS),
+                    ('local_host', RangeOperators.EQUAL),
+                    ('service_type', RangeOperators.EQUAL),
+                ],
+                condition=models.Q(status__in=ACTIVE_BOOKING_STATUSES),
+                violation_error_message='The host is already booked for this service on these dates.',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.traveler.username} -> {self.local_host.full_name} ({self.start_date})"
+
+
+class PlaceHostMatch(models.Model):
+    """
+    Precomputed pairing of a cached place with a nearby approved local host.
+    Maintained by local_hosts/matching.py whenever hosts or places change, so
+    "hosts for this place" is a single indexed read.
+    """
+    
+    place = models.ForeignKey('places.Place', on_delete=models.CASCADE, related_name='host_matches')
+    local_host = models.ForeignKey(LocalHost, on_delete=models.CASCADE, related_name='place_matches')
+    distance_km = models.FloatField()
+    score = models.FloatField(help_text="Higher is better; combines distance, services and rating")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['place', 'local_host']
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['place', '-score'], name='place_host_match_score_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.place} <-> {self.local_host.full_name} ({self.score:.2f})"
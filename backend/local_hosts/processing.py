@@ -0,0 +1,171 @@
+"""
+Background processing of uploaded verification documents
+New documents are left PENDING by the upload views and picked up by the
+process_documents worker, which verifies the checksum, extracts metadata and
+renders a compressed preview image (of the first page, for PDFs) for the
+admin review pages.
+"""
+import io
+import logging
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+import pypdfium2 as pdfium
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import LocalHostDocument
+from .uploads import hash_file
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MAX_SIZE = (800, 800)
+PREVIEW_QUALITY = 70
+PREVIEW_PREFIX = 'local_host_documents/previews'
+
+# A claim older than this is assumed to belong to a crashed worker
+STALE_CLAIM_AFTER = timedelta(minutes=15)
+
+
+def pending_fields():
+    """Field values that queue a (re)uploaded document for processing"""
+    return {
+        'processing_status': 'PENDING',
+        'processing_started_at': None,
+        'processed_at': None,
+        'processing_error': '',
+        'preview': '',
+        'metadata': {},
+    }
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to batch_size pending documents as PROCESSING and return them.
+    Rows locked by another worker are skipped, so workers can run in parallel.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            LocalHostDocument.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(processing_status='PENDING')
+                | Q(processing_status='PROCESSING', processing_started_at__lt=now - STALE_CLAIM_AFTER)
+            )
+            .order_by('uploaded_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        LocalHostDocument.objects.filter(id__in=ids).update(
+            processing_status='PROCESSING', processing_started_at=now
+        )
+    return list(LocalHostDocument.objects.filter(id__in=ids))
+
+
+def extract_metadata(document, fileobj):
+    """Size, checksum and format information for a stored document"""
+    sha256, size = hash_file(fileobj)
+    metadata = {
+        'size': size,
+        'sha256': sha256,
+        'checksum_ok': not document.content_hash or document.content_hash == sha256,
+        'content_type': document.content_type,
+    }
+
+    header = fileobj.read(16)
+    fileobj.seek(0)
+    if header.startswith(b'%PDF-'):
+        metadata['format'] = 'PDF'
+        metadata['pdf_version'] = header[5:8].decode('ascii', 'replace')
+    return metadata
+
+
+def open_pdf_page(fileobj, metadata):
+    """First page of a PDF as an image, rendered at about the preview size"""
+    pdf = pdfium.PdfDocument(fileobj.read())
+    fileobj.seek(0)
+    try:
+        metadata['page_count'] = len(pdf)
+        if not len(pdf):
+            return None
+        page = pdf[0]
+        width, height = page.get_size()
+        scale = min(PREVIEW_MAX_SIZE[0] / width, PREVIEW_MAX_SIZE[1] / height)
+        return page.render(scale=scale).to_pil()
+    finally:
+        pdf.close()
+
+
+def render_preview(fileobj, metadata):
+    """
+    Compressed JPEG preview of an image document, or of the first page of a
+    PDF, stored under the checksum of the original so identical files share
+    a preview. Returns the storage name, or '' for other files.
+    """
+    if metadata.get('format') == 'PDF':
+        image = open_pdf_page(fileobj, metadata)
+        if image is None:
+            return ''
+    else:
+        try:
+            image = Image.open(fileobj)
+            image.load()
+        except UnidentifiedImageError:
+            return ''
+
+        metadata.update({
+            'format': image.format,
+            'width': image.width,
+            'height': image.height,
+            'mode': image.mode,
+        })
+        # Normalize orientation before downscaling
+        image = ImageOps.exif_transpose(image)
+
+    image = image.convert('RGB')
+    image.thumbnail(PREVIEW_MAX_SIZE)
+
+    name = f"{PREVIEW_PREFIX}/{metadata['sha256']}.jpg"
+    if not default_storage.exists(name):
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=PREVIEW_QUALITY, optimize=True)
+        name = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return name
+
+
+def process_document(document):
+    """Process one claimed document and record the outcome on it"""
+    claimed_at = document.processing_started_at
+    try:
+        with document.document_file.open('rb') as fileobj:
+            metadata = extract_metadata(document, fileobj)
+            preview = render_preview(fileobj, metadata)
+    except Exception as e:
+        logger.exception(f"Error processing document {document.id}")
+        result = {'processing_status': 'FAILED', 'processing_error': str(e)}
+    else:
+        result = {
+            'processing_status': 'DONE',
+            'processing_error': '',
+            'metadata': metadata,
+            'preview': preview,
+        }
+
+    # Skip the write if the document was replaced while we worked on it
+    updated = LocalHostDocument.objects.filter(
+        id=document.id, processing_status='PROCESSING', processing_started_at=claimed_at
+    ).update(processed_at=timezone.now(), **result)
+    return updated == 1 and result['processing_status'] == 'DONE'
+
+
+def process_pending(batch_size=20):
+    """Claim and process one batch. Returns (processed, failed) counts."""
+    processed = failed = 0
+    for document in claim_batch(batch_size):
+        if process_document(document):
+            processed += 1
+        else:
+            failed += 1
+    return processed, failed
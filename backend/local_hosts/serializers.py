@@ -1,6 +1,20 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import LocalHost, LocalHostDocument, LocalHostReview, LocalHostBooking
+from django.db import IntegrityError, transaction
+from django.db.models import Avg
+from .models import (
+    LocalHost, LocalHostDocument, LocalHostDocumentUpload, LocalHostReview, LocalHostBooking,
+    PlaceHostMatch, ACTIVE_BOOKING_STATUSES
+)
+from . import availability
+
+
+def validate_coordinates(data):
+    """Latitude and longitude must be given together"""
+    if ('latitude' in data) != ('longitude' in data):
+        raise serializers.ValidationError("Latitude and longitude must be provided together.")
+    if (data.get('latitude') is None) != (data.get('longitude') is None):
+        raise serializers.ValidationError("Latitude and longitude must be provided together.")
 
 
 class LocalHostApplicationSerializer(serializers.ModelSerializer):
@@ -9,12 +23,16 @@ class LocalHostApplicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = LocalHost
         fields = [
-            'full_name', 'age', 'address', 'phone_number',
+            'full_name', 'age', 'address', 'latitude', 'longitude', 'phone_number',
             'aadhaar_number', 'pan_number', 'services_offered',
             'custom_service', 'service_description', 'experience_years',
             'price_range', 'availability', 'documents_provided'
         ]
     
+    def validate(self, data):
+        validate_coordinates(data)
+        return data
+    
     def validate_services_offered(self, value):
         """Validate that services_offered contains valid service codes"""
         valid_codes = [code for code, _ in LocalHost.SERVICE_CHOICES]
@@ -53,15 +71,32 @@ class LocalHostSerializer(serializers.ModelSerializer):
     class Meta:
         model = LocalHost
         fields = [
-            'id', 'user', 'full_name', 'age', 'address', 'phone_number',
+            'id', 'user', 'full_name', 'age', 'address', 'latitude', 'longitude',
+            'location_source', 'phone_number',
             'services_offered', 'service_names', 'custom_service',
             'service_description', 'experience_years', 'price_range',
             'availability', 'status', 'is_approved', 'application_date',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'user', 'status', 'application_date', 'created_at', 'updated_at'
+            'user', 'location_source', 'status', 'application_date', 'created_at', 'updated_at'
         ]
+    
+    def validate(self, data):
+        validate_coordinates(data)
+        return data
+    
+    def update(self, instance, validated_data):
+        """Re-resolve the location when the address changes and no coordinates are given"""
+        address_changed = 'address' in validated_data and validated_data['address'] != instance.address
+        coordinates_given = 'latitude' in validated_data or 'longitude' in validated_data
+        if coordinates_given:
+            instance.location_source = 'MANUAL'
+        elif address_changed and instance.location_source != 'MANUAL':
+            instance.latitude = None
+            instance.longitude = None
+            instance.location_source = ''
+        return super().update(instance, validated_data)
 
 
 class LocalHostDocumentSerializer(serializers.ModelSerializer):
@@ -70,10 +105,34 @@ class LocalHostDocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = LocalHostDocument
         fields = [
-            'id', 'document_type', 'document_file', 'uploaded_at',
-            'is_verified', 'verification_notes'
+            'id', 'document_type', 'document_file', 'content_hash', 'content_type',
+            'file_size', 'uploaded_at', 'is_verified', 'verification_notes',
+            'processing_status'
+        ]
+        read_only_fields = [
+            'content_hash', 'content_type', 'file_size', 'is_verified',
+            'verification_notes', 'uploaded_at', 'processing_status'
+        ]
+
+
+class LocalHostDocumentUploadSerializer(serializers.ModelSerializer):
+    """Serializer for resumable document upload sessions"""
+    
+    offset = serializers.IntegerField(source='received_size', read_only=True)
+    document = LocalHostDocumentSerializer(read_only=True)
+    
+    class Meta:
+        model = LocalHostDocumentUpload
+        fields = [
+            'id', 'document_type', 'filename', 'content_type', 'total_size',
+            'offset', 'status', 'document', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['is_verified', 'verification_notes', 'uploaded_at']
+        read_only_fields = ['id', 'offset', 'status', 'document', 'created_at', 'updated_at']
+    
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("File size must be greater than zero.")
+        return value
 
 
 class LocalHostReviewSerializer(serializers.ModelSerializer):
@@ -113,10 +172,40 @@ class LocalHostBookingSerializer(serializers.ModelSerializer):
             'traveler_name', 'local_host_name', 'created_at', 'updated_at'
         ]
     
+    def validate(self, data):
+        """Validate the dates and that the host is free for them"""
+        instance = self.instance
+        
+        def current(field):
+            if field in data:
+                return data[field]
+            return getattr(instance, field, None)
+        
+        start_date = current('start_date')
+        end_date = current('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({"end_date": "End date cannot be before start date."})
+        
+        status = current('status') or 'PENDING'
+        if status in ACTIVE_BOOKING_STATUSES and not availability.is_available(
+            current('local_host'), start_date, end_date,
+            service_type=current('service_type'),
+            exclude_id=instance.pk if instance else None,
+        ):
+            raise serializers.ValidationError("The host is already booked for this service on these dates.")
+        
+        return data
+    
     def create(self, validated_data):
         """Create a new booking"""
         validated_data['traveler'] = self.context['request'].user
-        return super().create(validated_data)
+        try:
+            # A concurrent booking can still win the race; the exclusion
+            # constraint is the final arbiter
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError("The host is already booked for this service on these dates.")
 
 
 class LocalHostPublicSerializer(serializers.ModelSerializer):
@@ -136,20 +225,66 @@ class LocalHostPublicSerializer(serializers.ModelSerializer):
     
     def get_average_rating(self, obj):
         """Calculate average rating"""
-        reviews = obj.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return None
+        if hasattr(obj, 'average_rating_value'):
+            return obj.average_rating_value
+        return obj.reviews.aggregate(value=Avg('rating'))['value']
     
     def get_review_count(self, obj):
         """Get total number of reviews"""
+        if hasattr(obj, 'review_count_value'):
+            return obj.review_count_value
         return obj.reviews.count()
 
 
 class LocalHostDetailSerializer(LocalHostPublicSerializer):
     """Detailed serializer for individual local host view"""
     
-    recent_reviews = LocalHostReviewSerializer(source='reviews', many=True, read_only=True)
+    # Only the latest reviews are embedded; the full history is paginated
+    # on /api/local-hosts/<id>/reviews/
+    RECENT_REVIEWS_LIMIT = 5
+    
+    recent_reviews = serializers.SerializerMethodField()
     
     class Meta(LocalHostPublicSerializer.Meta):
         fields = LocalHostPublicSerializer.Meta.fields + ['recent_reviews']
+    
+    def get_recent_reviews(self, obj):
+        """Get the latest reviews with their reviewers in a single query"""
+        reviews = (
+            obj.reviews.select_related('reviewer')
+            .order_by('-created_at', 'id')[:self.RECENT_REVIEWS_LIMIT]
+        )
+        return LocalHostReviewSerializer(reviews, many=True, context=self.context).data
+
+
+class LocalHostNearbySerializer(LocalHostPublicSerializer):
+    """Public local host with its distance from the requested place"""
+    
+    distance_km = serializers.SerializerMethodField()
+    
+    class Meta(LocalHostPublicSerializer.Meta):
+        fields = LocalHostPublicSerializer.Meta.fields + ['latitude', 'longitude', 'distance_km']
+    
+    def get_distance_km(self, obj):
+        return round(obj.distance_km, 2)
+
+
+class PlaceHostMatchSerializer(serializers.ModelSerializer):
+    """A local host suggested for a place"""
+    
+    id = serializers.IntegerField(source='local_host.id', read_only=True)
+    full_name = serializers.CharField(source='local_host.full_name', read_only=True)
+    services_offered = serializers.ListField(source='local_host.services_offered', read_only=True)
+    service_names = serializers.ListField(source='local_host.service_names', read_only=True)
+    price_range = serializers.CharField(source='local_host.price_range', read_only=True)
+    distance_km = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = PlaceHostMatch
+        fields = [
+            'id', 'full_name', 'services_offered', 'service_names',
+            'price_range', 'distance_km', 'score'
+        ]
+    
+    def get_distance_km(self, obj):
+        return round(obj.distance_km, 2)
@@ -1,3 +1,82 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from authentication.tokens import ClaimsRefreshToken
+from backend.query_budget import assert_max_queries, count_queries
+
+from .models import LocalHost, LocalHostBooking, LocalHostReview
+from .views import LocalHostBookingListView, LocalHostListView
+
+
+def make_host(index):
+    user = User.objects.create_user(username=f'host{index}', email=f'host{index}@example.com', password='x' * 12)
+    return LocalHost.objects.create(
+        user=user,
+        full_name=f'Host {index}',
+        age=30,
+        address='Fort Kochi, Ernakulam',
+        phone_number='9876543210',
+        aadhaar_number=f'{123456789000 + index}',
+        services_offered=['GUIDE'],
+        service_description='Walking tours',
+        documents_provided=['AADHAAR'],
+        status='APPROVED',
+    )
+
+
+class QueryBudgetTests(TestCase):
+    """The listings must run a fixed number of queries, whatever the page holds"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.traveler = User.objects.create_user(username='traveler', email='traveler@example.com', password='x' * 12)
+        self.hosts = []
+
+    def add_hosts(self, count):
+        for _ in range(count):
+            host = make_host(len(self.hosts))
+            self.hosts.append(host)
+            LocalHostReview.objects.create(
+                local_host=host, reviewer=self.traveler, rating=4, service_type='GUIDE'
+            )
+            LocalHostBooking.objects.create(
+                local_host=host,
+                traveler=self.traveler,
+                service_type='GUIDE',
+                start_date=date.today() + timedelta(days=len(self.hosts)),
+                end_date=date.today() + timedelta(days=len(self.hosts) + 1),
+            )
+
+    def authenticate(self, user):
+        token = ClaimsRefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def query_count(self, url, budget):
+        with assert_max_queries(budget), count_queries() as counter:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return counter.count
+
+    def assert_constant_queries(self, url, budget):
+        self.add_hosts(2)
+        # Warm up per-user state (e.g. the token state copy) first
+        self.query_count(url, budget)
+        few = self.query_count(url, budget)
+        self.add_hosts(6)
+        many = self.query_count(url, budget)
+        self.assertEqual(few, many, "query count grows with the number of rows")
+
+    def test_local_host_list(self):
+        self.assert_constant_queries('/api/local-hosts/', LocalHostListView.query_budget)
+
+    def test_local_host_list_with_total(self):
+        self.assert_constant_queries('/api/local-hosts/?include_total=true', LocalHostListView.query_budget)
 
-# Create your tests here.
+    def test_booking_list(self):
+        self.authenticate(self.traveler)
+        self.assert_constant_queries('/api/local-hosts/bookings/', LocalHostBookingListView.query_budget)
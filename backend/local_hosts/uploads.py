@@ -0,0 +1,238 @@
+"""
+Streaming, resumable document uploads with content-addressed storage
+
+Clients open an upload session declaring the file's size and type, then send
+the bytes in chunks (each a PUT with a Content-Range header). A chunk is
+first streamed to a staging file of its own, without holding any lock, and
+only then appended to the upload's part file while the upload row is locked.
+Memory use is bounded by the copy buffer, and a client can resume from the
+offset the server reports. When the last chunk arrives the file is hashed and
+moved to a path derived from its SHA-256, so identical files are stored only
+once.
+"""
+import glob
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+# Copy buffer used when streaming request bodies and hashing files
+COPY_BUFFER_SIZE = 64 * 1024
+
+CONTENT_ADDRESSED_PREFIX = 'local_host_documents/sha256'
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+# A chunk streamed to disk, waiting to be appended to its upload's part file
+StagedChunk = namedtuple('StagedChunk', ['start', 'end', 'path'])
+
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'application/pdf': '.pdf',
+}
+
+
+class UploadError(Exception):
+    """A chunk or upload that can't be accepted; carries the HTTP status to reply with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def max_size_for(content_type):
+    """Size cap in bytes for a content type, or None if the type is not accepted"""
+    return settings.DOCUMENT_UPLOAD_MAX_SIZES.get(content_type)
+
+
+def check_declared_size(content_type, size):
+    """Reject a file by its declared type and size before any bytes are read"""
+    max_size = max_size_for(content_type)
+    if max_size is None:
+        allowed = ', '.join(sorted(settings.DOCUMENT_UPLOAD_MAX_SIZES))
+        raise UploadError(f"Unsupported file type {content_type}. Allowed types: {allowed}", 415)
+    if size > max_size:
+        raise UploadError(f"File is too large. Maximum size for {content_type} is {max_size} bytes", 413)
+
+
+class DocumentSizeCapHandler(FileUploadHandler):
+    """
+    Multipart upload handler that stops reading a file as soon as it passes
+    the cap for its declared type. The error is kept on the handler, for the
+    view to report once parsing has stopped.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.received = 0
+        self.check(content_length or 0)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        self.check(self.received)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def check(self, size):
+        try:
+            check_declared_size(self.content_type, size)
+        except UploadError as e:
+            self.error = e
+            # Don't read the rest of the body
+            raise StopUpload(connection_reset=True)
+
+
+def part_path(upload):
+    """Path of the part file an upload session is being assembled into"""
+    return os.path.join(settings.DOCUMENT_UPLOAD_TEMP_DIR, f'{upload.id}.part')
+
+
+def parse_content_range(header):
+    """Parse 'bytes start-end/total' into integers"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError("A Content-Range header of the form 'bytes start-end/total' is required")
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError("Invalid Content-Range")
+    return start, end, total
+
+
+def stage_chunk(upload, stream, content_range, content_length, expected_sha256=None):
+    """
+    Stream one chunk from the request body to a staging file, checking it
+    against the upload's current offset. No lock is needed (or should be
+    held): commit_chunk() re-checks the offset under the row lock.
+    """
+    start, end, total = parse_content_range(content_range)
+    length = end - start + 1
+
+    if total != upload.total_size:
+        raise UploadError("Content-Range total does not match the declared file size")
+    if start != upload.received_size:
+        raise UploadError(f"Expected a chunk starting at byte {upload.received_size}", 409)
+    if end >= upload.total_size:
+        raise UploadError("Chunk extends past the declared file size", 413)
+    if content_length != length:
+        raise UploadError("Content-Length does not match Content-Range")
+
+    os.makedirs(settings.DOCUMENT_UPLOAD_TEMP_DIR, exist_ok=True)
+    chunk = StagedChunk(
+        start, end, os.path.join(settings.DOCUMENT_UPLOAD_TEMP_DIR, f'{upload.id}.{uuid.uuid4().hex}.chunk')
+    )
+    chunk_hash = hashlib.sha256()
+    written = 0
+
+    try:
+        with open(chunk.path, 'wb') as staged:
+            while written < length:
+                data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                if not data:
+                    break
+                staged.write(data)
+                chunk_hash.update(data)
+                written += len(data)
+
+        if written != length:
+            raise UploadError("Chunk body ended early; resume from the reported offset")
+        if expected_sha256 and chunk_hash.hexdigest() != expected_sha256.lower():
+            raise UploadError("Chunk checksum mismatch; resend the chunk", 422)
+    except BaseException:
+        discard_chunk(chunk)
+        raise
+
+    return chunk
+
+
+def commit_chunk(upload, chunk):
+    """
+    Append a staged chunk to the upload's part file. The upload row must be
+    locked by the caller. Returns the new offset.
+    """
+    if chunk.start != upload.received_size:
+        # Another request stored a chunk since this one was staged
+        raise UploadError(f"Expected a chunk starting at byte {upload.received_size}", 409)
+
+    with open(part_path(upload), 'ab') as part, open(chunk.path, 'rb') as staged:
+        # Drop any tail left by an interrupted append
+        part.truncate(upload.received_size)
+        shutil.copyfileobj(staged, part, COPY_BUFFER_SIZE)
+    discard_chunk(chunk)
+
+    return chunk.end + 1
+
+
+def discard_chunk(chunk):
+    try:
+        os.remove(chunk.path)
+    except FileNotFoundError:
+        pass
+
+
+def hash_file(fileobj):
+    """SHA-256 and size of a file object, read in bounded chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while True:
+        data = fileobj.read(COPY_BUFFER_SIZE)
+        if not data:
+            break
+        digest.update(data)
+        size += len(data)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def content_addressed_name(sha256, content_type):
+    extension = CONTENT_TYPE_EXTENSIONS.get(content_type, '')
+    return f'{CONTENT_ADDRESSED_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def store_content_addressed(fileobj, content_type):
+    """
+    Save a file under its content hash. If the same bytes were stored before,
+    the existing file is reused. Returns (storage name, sha256, size).
+    """
+    sha256, size = hash_file(fileobj)
+    name = content_addressed_name(sha256, content_type)
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, File(fileobj))
+        if saved != name:
+            # Lost a race with an identical upload; keep the canonical copy
+            default_storage.delete(saved)
+    return name, sha256, size
+
+
+def finalize_upload(upload):
+    """Move a fully received part file into content-addressed storage"""
+    path = part_path(upload)
+    with open(path, 'rb') as part:
+        stored = store_content_addressed(part, upload.content_type)
+    os.remove(path)
+    return stored
+
+
+def discard_part(upload):
+    """Remove an upload's part file and any chunks left staged"""
+    staged = glob.glob(os.path.join(settings.DOCUMENT_UPLOAD_TEMP_DIR, f'{upload.id}.*.chunk'))
+    for path in [part_path(upload), *staged]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
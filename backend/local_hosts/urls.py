@@ -11,14 +11,18 @@ urlpatterns = [
     
     # Public views
     path('', views.LocalHostListView.as_view(), name='list'),
+    path('near/', views.LocalHostNearbyView.as_view(), name='near'),
     path('<int:pk>/', views.LocalHostDetailView.as_view(), name='detail'),
     path('constants/', views.local_host_constants, name='constants'),
+    path('<int:pk>/availability/', views.local_host_availability, name='availability'),
     
     # Document upload
     path('documents/upload/', views.LocalHostDocumentUploadView.as_view(), name='document-upload'),
+    path('documents/uploads/', views.LocalHostDocumentUploadSessionView.as_view(), name='document-upload-start'),
+    path('documents/uploads/<uuid:upload_id>/', views.LocalHostDocumentUploadChunkView.as_view(), name='document-upload-chunk'),
     
     # Reviews
-    path('<int:local_host_id>/reviews/', views.LocalHostReviewCreateView.as_view(), name='create-review'),
+    path('<int:local_host_id>/reviews/', views.LocalHostReviewListCreateView.as_view(), name='reviews'),
     
     # Bookings
     path('bookings/', views.LocalHostBookingListView.as_view(), name='booking-list'),
@@ -1,23 +1,29 @@
-from rest_framework import generics, status, permissions
+from rest_framework import generics, status, permissions, exceptions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Avg, Count
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+import uuid
 
-from .models import LocalHost, LocalHostDocument, LocalHostReview, LocalHostBooking
+from .models import LocalHost, LocalHostDocument, LocalHostDocumentUpload, LocalHostReview, LocalHostBooking
 from .serializers import (
     LocalHostApplicationSerializer, LocalHostSerializer, LocalHostDocumentSerializer,
     LocalHostReviewSerializer, LocalHostBookingSerializer, LocalHostPublicSerializer,
-    LocalHostDetailSerializer
+    LocalHostDetailSerializer, LocalHostNearbySerializer, LocalHostDocumentUploadSerializer
 )
-
-
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 50
+from .pagination import KeysetPagination
+from backend.query_budget import query_budget
+from backend.conditional import STATIC_CACHE, make_etag, not_modified, with_validators
+from . import availability, matching, uploads
+from .processing import pending_fields
+from places.models import Place
+from services import geo
 
 
 class LocalHostApplicationView(generics.CreateAPIView):
@@ -33,6 +39,7 @@ class LocalHostApplicationView(generics.CreateAPIView):
         # For demo purposes, auto-approve the application and mark user as local host
         local_host.status = 'APPROVED'
         local_host.save()
+        matching.refresh_host(local_host)
         
         # Update user profile to mark as local host
         user_profile = request.user.profile
@@ -53,17 +60,25 @@ class LocalHostProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return get_object_or_404(LocalHost, user=self.request.user)
+        return get_object_or_404(LocalHost, user_id=self.request.user.pk)
+    
+    def perform_update(self, serializer):
+        local_host = serializer.save()
+        matching.refresh_host(local_host)
 
 
 class LocalHostListView(generics.ListAPIView):
     """List approved local hosts (public view)"""
     serializer_class = LocalHostPublicSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
     permission_classes = [permissions.AllowAny]
+    query_budget = 3  # auth user, optional total estimate, page
     
     def get_queryset(self):
-        queryset = LocalHost.objects.filter(status='APPROVED')
+        queryset = LocalHost.objects.filter(status='APPROVED').annotate(
+            average_rating_value=Avg('reviews__rating'),
+            review_count_value=Count('reviews'),
+        )
         
         # Filter by services
         services = self.request.query_params.get('services', None)
@@ -79,37 +94,313 @@ class LocalHostListView(generics.ListAPIView):
                 Q(service_description__icontains=search)
             )
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', 'id')
+
+
+class LocalHostNearbyView(generics.ListAPIView):
+    """
+    List approved local hosts near a place, closest first.
+    Candidates are narrowed with a geohash prefix scan on an index before the
+    exact distance is computed in the same query.
+    """
+    serializer_class = LocalHostNearbySerializer
+    permission_classes = [permissions.AllowAny]
+    query_budget = 3  # auth user, place, hosts
+    
+    DEFAULT_RADIUS_KM = 10
+    MAX_RADIUS_KM = 50
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 50
+    
+    def list(self, request, *args, **kwargs):
+        place_id = request.query_params.get('place_id')
+        if not place_id:
+            return Response({
+                "detail": "place_id parameter is required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            radius = float(request.query_params.get('radius', self.DEFAULT_RADIUS_KM))
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            return Response({
+                "detail": "radius and limit must be numbers"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not 0 < radius <= self.MAX_RADIUS_KM:
+            return Response({
+                "detail": f"radius must be between 0 and {self.MAX_RADIUS_KM} km"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        service = request.query_params.get('service')
+        if service and service not in dict(LocalHost.SERVICE_CHOICES):
+            return Response({
+                "detail": f"Invalid service code: {service}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        self.place = self.get_place(place_id)
+        self.radius = radius
+        self.service = service
+        self.limit = max(1, min(limit, self.MAX_LIMIT))
+        
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response({
+            'place': {
+                'id': str(self.place.id),
+                'google_place_id': self.place.google_place_id,
+                'name': self.place.name,
+            },
+            'radius_km': radius,
+            'local_hosts': serializer.data,
+            'count': len(serializer.data)
+        })
+    
+    def get_place(self, place_id):
+        """Look a cached place up by its id or its Google place id"""
+        try:
+            return get_object_or_404(Place, id=uuid.UUID(place_id))
+        except ValueError:
+            return get_object_or_404(Place, google_place_id=place_id)
+    
+    def get_queryset(self):
+        latitude, longitude = self.place.latitude, self.place.longitude
+        precision = geo.geohash_precision_for_radius(self.radius, latitude)
+        cells = geo.geohash_neighbors(geo.geohash_encode(latitude, longitude, precision))
+        
+        in_cells = Q()
+        for cell in cells:
+            in_cells |= Q(geohash__startswith=cell)
+        
+        queryset = LocalHost.objects.filter(in_cells, status='APPROVED')
+        if self.service:
+            queryset = queryset.filter(services_offered__contains=[self.service])
+        
+        return (
+            queryset
+            .annotate(
+                distance_km=geo.distance_km_expression(latitude, longitude),
+                average_rating_value=Avg('reviews__rating'),
+                review_count_value=Count('reviews'),
+            )
+            .filter(distance_km__lte=self.radius)
+            .order_by('distance_km', 'id')[:self.limit]
+        )
 
 
 class LocalHostDetailView(generics.RetrieveAPIView):
     """Get detailed information about a specific local host"""
     serializer_class = LocalHostDetailSerializer
     permission_classes = [permissions.AllowAny]
+    query_budget = 3  # auth user, host with rating aggregates, latest reviews
     
     def get_queryset(self):
-        return LocalHost.objects.filter(status='APPROVED')
+        return LocalHost.objects.filter(status='APPROVED').annotate(
+            average_rating_value=Avg('reviews__rating'),
+            review_count_value=Count('reviews'),
+        )
+
+
+class UploadRejected(exceptions.APIException):
+    """API error carrying the status of an uploads.UploadError"""
+    
+    def __init__(self, error):
+        super().__init__(error.message)
+        self.status_code = error.status_code
+
+
+def request_content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
 
 
 class LocalHostDocumentUploadView(generics.CreateAPIView):
-    """Upload verification documents"""
+    """
+    Upload a verification document in a single multipart request.
+    Large files should use the resumable upload endpoints instead.
+    """
     serializer_class = LocalHostDocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    # Room for the multipart envelope around the file
+    MULTIPART_OVERHEAD = 64 * 1024
+    
+    def create(self, request, *args, **kwargs):
+        # Refuse oversized bodies before the multipart parser reads them
+        max_size = max(settings.DOCUMENT_UPLOAD_MAX_SIZES.values())
+        if request_content_length(request) > max_size + self.MULTIPART_OVERHEAD:
+            return Response({
+                "detail": f"File is too large. Maximum size is {max_size} bytes"
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        # The file's own type is only known once its part header is parsed;
+        # the handler stops reading as soon as it passes that type's cap
+        cap = uploads.DocumentSizeCapHandler(request._request)
+        request.upload_handlers.insert(0, cap)
+        request.data
+        if cap.error is not None:
+            raise UploadRejected(cap.error)
+        return super().create(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         local_host = get_object_or_404(LocalHost, user=self.request.user)
+        uploaded = serializer.validated_data['document_file']
+        try:
+            uploads.check_declared_size(uploaded.content_type, uploaded.size)
+        except uploads.UploadError as e:
+            raise UploadRejected(e)
+        
+        name, content_hash, size = uploads.store_content_addressed(uploaded, uploaded.content_type)
+        
+        # Re-uploading a document type replaces the previous file
+        serializer.instance = LocalHostDocument.objects.filter(
+            local_host=local_host, document_type=serializer.validated_data['document_type']
+        ).first()
+        serializer.save(
+            local_host=local_host,
+            document_file=name,
+            content_hash=content_hash,
+            content_type=uploaded.content_type,
+            file_size=size,
+            is_verified=False,
+            **pending_fields(),
+        )
+
+
+class LocalHostDocumentUploadSessionView(generics.CreateAPIView):
+    """
+    Start a resumable document upload.
+    The declared type and size are checked against the caps before any bytes
+    are sent; the response carries the upload id and the suggested chunk size.
+    """
+    serializer_class = LocalHostDocumentUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def create(self, request, *args, **kwargs):
+        local_host = get_object_or_404(LocalHost, user=request.user)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            uploads.check_declared_size(
+                serializer.validated_data['content_type'],
+                serializer.validated_data['total_size'],
+            )
+        except uploads.UploadError as e:
+            raise UploadRejected(e)
+        
         serializer.save(local_host=local_host)
+        return Response({
+            **serializer.data,
+            'chunk_size': settings.DOCUMENT_UPLOAD_CHUNK_SIZE,
+        }, status=status.HTTP_201_CREATED)
 
 
-class LocalHostReviewCreateView(generics.CreateAPIView):
-    """Create a review for a local host"""
-    serializer_class = LocalHostReviewSerializer
+class LocalHostDocumentUploadChunkView(APIView):
+    """
+    GET reports how many bytes of an upload were received, so a client can
+    resume. PUT appends the next chunk (raw body with a Content-Range header
+    and an optional X-Chunk-SHA256 checksum); the last chunk completes the
+    upload and creates or replaces the document.
+    """
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_upload(self, upload_id, lock=False):
+        queryset = LocalHostDocumentUpload.objects.all()
+        if lock:
+            queryset = queryset.select_for_update()
+        return get_object_or_404(queryset, id=upload_id, local_host__user_id=self.request.user.pk)
+    
+    def get(self, request, upload_id):
+        upload = self.get_upload(upload_id)
+        return Response(LocalHostDocumentUploadSerializer(upload).data)
+    
+    def put(self, request, upload_id):
+        upload = self.get_upload(upload_id)
+        if upload.is_complete:
+            return self.already_complete(upload)
+        
+        # The body is read before the row is locked, so a slow client only
+        # holds up its own staging file
+        try:
+            chunk = uploads.stage_chunk(
+                upload,
+                request.stream,
+                request.META.get('HTTP_CONTENT_RANGE'),
+                request_content_length(request),
+                expected_sha256=request.META.get('HTTP_X_CHUNK_SHA256'),
+            )
+        except uploads.UploadError as e:
+            return self.rejected(e, upload)
+        
+        try:
+            with transaction.atomic():
+                upload = self.get_upload(upload_id, lock=True)
+                if upload.is_complete:
+                    return self.already_complete(upload)
+                
+                try:
+                    upload.received_size = uploads.commit_chunk(upload, chunk)
+                except uploads.UploadError as e:
+                    return self.rejected(e, upload)
+                
+                completed = upload.received_size == upload.total_size
+                if completed:
+                    name, content_hash, size = uploads.finalize_upload(upload)
+                    upload.document, _ = LocalHostDocument.objects.update_or_create(
+                        local_host=upload.local_host,
+                        document_type=upload.document_type,
+                        defaults={
+                            'document_file': name,
+                            'content_hash': content_hash,
+                            'content_type': upload.content_type,
+                            'file_size': size,
+                            'is_verified': False,
+                            'verification_notes': None,
+                            **pending_fields(),
+                        }
+                    )
+                    upload.status = 'COMPLETE'
+                upload.save()
+        finally:
+            uploads.discard_chunk(chunk)
+        
+        return Response(
+            LocalHostDocumentUploadSerializer(upload).data,
+            status=status.HTTP_201_CREATED if completed else status.HTTP_200_OK
+        )
+    
+    def already_complete(self, upload):
+        return Response({
+            "detail": "Upload already complete.",
+            "upload": LocalHostDocumentUploadSerializer(upload).data
+        }, status=status.HTTP_409_CONFLICT)
+    
+    def rejected(self, error, upload):
+        return Response({
+            "detail": error.message,
+            "offset": upload.received_size
+        }, status=error.status_code)
+
+
+class LocalHostReviewListCreateView(generics.ListCreateAPIView):
+    """List a local host's reviews (cursor paginated) or create a new one"""
+    serializer_class = LocalHostReviewSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    query_budget = 4  # auth user, host, optional total estimate, page
+    
+    def get_queryset(self):
+        local_host = get_object_or_404(LocalHost, id=self.kwargs['local_host_id'], status='APPROVED')
+        return local_host.reviews.select_related('reviewer').order_by('-created_at', 'id')
+    
     def perform_create(self, serializer):
         local_host_id = self.kwargs['local_host_id']
         local_host = get_object_or_404(LocalHost, id=local_host_id, status='APPROVED')
         serializer.save(local_host=local_host)
+        # The new rating changes the host's match scores
+        matching.refresh_host(local_host)
 
 
 class LocalHostBookingCreateView(generics.CreateAPIView):
@@ -122,14 +413,21 @@ class LocalHostBookingListView(generics.ListAPIView):
     """List user's bookings"""
     serializer_class = LocalHostBookingSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
+    query_budget = 3  # auth user, optional total estimate, page
     
     def get_queryset(self):
-        user = self.request.user
-        # Show bookings where user is either the traveler or the local host
+        user_id = self.request.user.pk
+        # Show bookings where user is either the traveler or the local host.
+        # Names shown per row are joined in rather than fetched per booking.
         return LocalHostBooking.objects.filter(
-            Q(traveler=user) | Q(local_host__user=user)
-        ).order_by('-created_at')
+            Q(traveler_id=user_id) | Q(local_host__user_id=user_id)
+        ).select_related('traveler', 'local_host').only(
+            'id', 'local_host', 'traveler', 'service_type', 'start_date', 'end_date',
+            'number_of_people', 'special_requests', 'quoted_price', 'final_price',
+            'status', 'host_response', 'traveler_notes', 'created_at', 'updated_at',
+            'traveler__username', 'local_host__full_name',
+        ).order_by('-created_at', 'id')
 
 
 @api_view(['GET'])
@@ -137,7 +435,7 @@ class LocalHostBookingListView(generics.ListAPIView):
 def local_host_status(request):
     """Check if current user has a local host application and its status"""
     try:
-        local_host = LocalHost.objects.get(user=request.user)
+        local_host = LocalHost.objects.get(user_id=request.user.pk)
         serializer = LocalHostSerializer(local_host)
         return Response({
             'has_application': True,
@@ -150,12 +448,78 @@ def local_host_status(request):
         })
 
 
+# The constants only change with a deploy
+CONSTANTS_ETAG = make_etag(LocalHost.SERVICE_CHOICES, LocalHost.DOCUMENT_CHOICES, LocalHost.STATUS_CHOICES)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def local_host_constants(request):
     """Get constants for local host services and document types"""
-    return Response({
+    cached = not_modified(request, etag=CONSTANTS_ETAG, cache_control=STATIC_CACHE)
+    if cached:
+        return cached
+    
+    response = Response({
         'services': [{'code': code, 'name': name} for code, name in LocalHost.SERVICE_CHOICES],
         'documents': [{'code': code, 'name': name} for code, name in LocalHost.DOCUMENT_CHOICES],
         'statuses': [{'code': code, 'name': name} for code, name in LocalHost.STATUS_CHOICES]
     })
+    return with_validators(response, etag=CONSTANTS_ETAG, cache_control=STATIC_CACHE)
+
+
+
+@query_budget(3)  # auth user, host, overlapping bookings
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def local_host_availability(request, pk):
+    """Get the free date windows of an approved local host between two dates"""
+    local_host = get_object_or_404(LocalHost, pk=pk, status='APPROVED')
+    
+    today = timezone.localdate()
+    start_param = request.query_params.get('start_date')
+    end_param = request.query_params.get('end_date')
+    try:
+        # parse_date() returns None for malformed input and raises ValueError
+        # for well-formed but impossible dates (e.g. 2024-02-30)
+        start_date = parse_date(start_param) if start_param else today
+        end_date = parse_date(end_param) if end_param else None
+    except ValueError:
+        start_date = end_date = None
+    
+    if not start_date or (end_param and not end_date):
+        return Response({
+            "detail": "start_date and end_date must be dates in YYYY-MM-DD format"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not end_date:
+        end_date = start_date + timedelta(days=30)
+    
+    if end_date < start_date:
+        return Response({
+            "detail": "end_date cannot be before start_date"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if (end_date - start_date).days >= availability.MAX_WINDOW_DAYS:
+        return Response({
+            "detail": f"Date range cannot exceed {availability.MAX_WINDOW_DAYS} days"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    service_type = request.query_params.get('service_type')
+    if service_type and service_type not in dict(LocalHost.SERVICE_CHOICES):
+        return Response({
+            "detail": f"Invalid service code: {service_type}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    windows = availability.free_windows(local_host, start_date, end_date, service_type)
+    
+    return Response({
+        'local_host': local_host.id,
+        'service_type': service_type,
+        'start_date': start_date,
+        'end_date': end_date,
+        'free_windows': [
+            {'start_date': window_start, 'end_date': window_end}
+            for window_start, window_end in windows
+        ]
+    })
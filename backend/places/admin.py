@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Place, UserFavorite, PlaceVisit
+from .api_budget import usage_summary
+from .models import ApiUsage, FeedWarmup, Place, PlaceSearchMatch, SearchCoverage, UserFavorite, PlaceVisit
 
 @admin.register(Place)
 class PlaceAdmin(admin.ModelAdmin):
@@ -20,3 +21,39 @@ class PlaceVisitAdmin(admin.ModelAdmin):
     list_display = ['user', 'place', 'visited_at']
     list_filter = ['visited_at']
     search_fields = ['user__username', 'place__name']
+
+@admin.register(FeedWarmup)
+class FeedWarmupAdmin(admin.ModelAdmin):
+    list_display = ['district', 'geography', 'status', 'place_count', 'requested_at', 'finished_at']
+    list_filter = ['status', 'district', 'geography']
+    readonly_fields = ['requested_at', 'started_at', 'finished_at', 'place_count', 'last_error']
+
+@admin.register(SearchCoverage)
+class SearchCoverageAdmin(admin.ModelAdmin):
+    list_display = ['district', 'geography', 'searched_at', 'place_count']
+    list_filter = ['district', 'geography']
+
+@admin.register(PlaceSearchMatch)
+class PlaceSearchMatchAdmin(admin.ModelAdmin):
+    list_display = ['place', 'district', 'geography', 'first_seen_at', 'last_seen_at']
+    list_filter = ['district', 'geography']
+    search_fields = ['place__name']
+    raw_id_fields = ['place']
+
+@admin.register(ApiUsage)
+class ApiUsageAdmin(admin.ModelAdmin):
+    """Read-only call ledger, with today's totals against the budgets above the list"""
+    list_display = ['day', 'service', 'operation', 'user', 'calls', 'refused']
+    list_filter = ['day', 'service', 'operation']
+    search_fields = ['user__username']
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'usage_summary': usage_summary()}
+        return super().changelist_view(request, extra_context=extra_context)
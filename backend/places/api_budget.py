@@ -0,0 +1,190 @@
+"""
+External API call ledger and daily budgets
+
+Service code calls spend(service, operation) right before each billed call
+(spend(service, operation, count=n) for n billed items, such as photo URLs).
+It counts the calls against the day's budget in settings.API_DAILY_BUDGETS
+and raises BudgetExhausted instead when the budget is used up; services
+treat that like a failed call, so views fall back to the places, details and
+weather already stored. Background work (background_work()) stops earlier,
+at API_BUDGET_BACKGROUND_SHARE of each budget, which leaves the rest for
+users' requests.
+
+Today's running totals are ApiCallCounter rows, shared by all processes. A
+call is counted with one conditional UPDATE that only succeeds while the
+total stays within the limit, so concurrent calls can't overshoot it. Every
+call is also written to the ApiUsage ledger, per user: ApiLedgerMiddleware
+collects a request's calls and writes them once the request is done, when
+DRF has authenticated the user; calls made outside a request are written
+straight away.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import ApiCallCounter, ApiUsage
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetExhausted(Exception):
+    """The day's budget for an external API operation is used up"""
+
+
+# (day, service, operation, refused) -> calls for the request being handled
+_pending = ContextVar('api_budget_pending', default=None)
+_background = ContextVar('api_budget_background', default=False)
+
+
+@contextmanager
+def background_work():
+    """Mark calls made inside the block as background work (lower budget share)"""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+def daily_budget(service, operation):
+    """Calls allowed per day, or None when the operation has no budget"""
+    return settings.API_DAILY_BUDGETS.get(f'{service}.{operation}')
+
+
+def ledger_calls(day, service, operation):
+    return ApiUsage.objects.filter(day=day, service=service, operation=operation).aggregate(
+        total=Sum('calls')
+    )['total'] or 0
+
+
+def calls_today(service, operation, day=None):
+    """Calls counted so far today"""
+    day = day or timezone.localdate()
+    count = ApiCallCounter.objects.filter(day=day, service=service, operation=operation).values_list(
+        'calls', flat=True
+    ).first()
+    return ledger_calls(day, service, operation) if count is None else count
+
+
+def call_limit(service, operation):
+    """Calls allowed today for the current work (the background share inside background_work())"""
+    budget = daily_budget(service, operation)
+    if budget is None:
+        return None
+    return int(budget * settings.API_BUDGET_BACKGROUND_SHARE) if _background.get() else budget
+
+
+def within_budget(service, operation, day=None):
+    """Whether another call fits in today's budget"""
+    limit = call_limit(service, operation)
+    return limit is None or calls_today(service, operation, day) < limit
+
+
+def take_calls(day, service, operation, count, limit):
+    """Add count calls to the day's counter if the total stays within limit"""
+    counter = ApiCallCounter.objects.filter(day=day, service=service, operation=operation)
+    within_limit = counter.filter(calls__lte=limit - count)
+    if within_limit.update(calls=F('calls') + count):
+        return True
+    if counter.exists():
+        return False
+    # First call of the day: create the counter (starting from the ledger, in
+    # case calls were made before it existed) and try once more. Another
+    # request may create it first; the retry then counts against its row.
+    ApiCallCounter.objects.get_or_create(
+        day=day, service=service, operation=operation,
+        defaults={'calls': ledger_calls(day, service, operation)},
+    )
+    return bool(within_limit.update(calls=F('calls') + count))
+
+
+def spend(service, operation, count=1):
+    """Count count calls against today's budget, or raise BudgetExhausted"""
+    day = timezone.localdate()
+    limit = call_limit(service, operation)
+    if limit is not None and not take_calls(day, service, operation, count, limit):
+        record(day, service, operation, count, refused=True)
+        raise BudgetExhausted(f"Daily budget for {service}.{operation} is used up")
+    record(day, service, operation, count)
+
+
+def record(day, service, operation, count=1, refused=False):
+    pending = _pending.get()
+    if pending is None:
+        write_usage(day, service, operation, None, count, refused)
+        return
+    key = (day, service, operation, refused)
+    pending[key] = pending.get(key, 0) + count
+
+
+def write_usage(day, service, operation, user_id, count=1, refused=False):
+    """Add calls (or refusals) to a ledger row, creating it if needed"""
+    field = 'refused' if refused else 'calls'
+    row = ApiUsage.objects.filter(day=day, service=service, operation=operation, user_id=user_id)
+    if row.update(**{field: F(field) + count}):
+        return
+    try:
+        with transaction.atomic():
+            ApiUsage.objects.create(day=day, service=service, operation=operation, user_id=user_id, **{field: count})
+    except IntegrityError:
+        # Created by a concurrent request in the meantime
+        row.update(**{field: F(field) + count})
+
+
+class ApiLedgerMiddleware:
+    """Writes the external API calls of each request to the ledger, with its user"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pending = {}
+        token = _pending.set(pending)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pending.reset(token)
+
+        if pending:
+            # DRF sets the authenticated user on the underlying request
+            user = getattr(request, 'user', None)
+            user_id = user.pk if user is not None and user.is_authenticated else None
+            for (day, service, operation, refused), count in pending.items():
+                try:
+                    write_usage(day, service, operation, user_id, count, refused)
+                except Exception:
+                    logger.exception(f"Could not record {service}.{operation} usage")
+        return response
+
+
+def usage_summary(day=None):
+    """Per operation: calls, refusals and budget for one day (default today)"""
+    day = day or timezone.localdate()
+    rows = {
+        (row['service'], row['operation']): row
+        for row in ApiUsage.objects.filter(day=day).values('service', 'operation').annotate(
+            total_calls=Sum('calls'), total_refused=Sum('refused')
+        )
+    }
+    operations = set(rows)
+    operations.update(tuple(name.split('.', 1)) for name in settings.API_DAILY_BUDGETS)
+
+    summary = []
+    for service, operation in sorted(operations):
+        row = rows.get((service, operation), {})
+        calls = row.get('total_calls') or 0
+        budget = daily_budget(service, operation)
+        summary.append({
+            'service': service,
+            'operation': operation,
+            'calls': calls,
+            'refused': row.get('total_refused') or 0,
+            'budget': budget,
+            'used_percent': round(100 * calls / budget, 1) if budget else None,
+        })
+    return summary
@@ -0,0 +1,65 @@
+"""
+Point-in-district classification
+Places are assigned to the seeded District whose bounding box contains them.
+Neighbouring boxes overlap, so a point inside several goes to the district
+whose centre is nearest. Uses the in-process district catalog, so it needs
+no query.
+"""
+from typing import Iterable, List, Optional, Tuple
+
+from preferences.catalog import get_catalog
+from services.geo import haversine_km
+
+
+def district_for_point(latitude: Optional[float], longitude: Optional[float], districts=None) -> Optional[str]:
+    """Code of the district containing a point, or None outside every district"""
+    if latitude is None or longitude is None or (not latitude and not longitude):
+        return None
+
+    if districts is None:
+        districts = get_catalog('districts').rows
+    candidates = [district for district in districts if district.contains(latitude, longitude)]
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0].pk
+    return min(candidates, key=lambda district: haversine_km(latitude, longitude, *district.centroid())).pk
+
+
+def districts_for_points(points: Iterable[Tuple[float, float]]) -> List[Optional[str]]:
+    """district_for_point() for many points against one catalog snapshot"""
+    districts = get_catalog('districts').rows
+    return [district_for_point(latitude, longitude, districts) for latitude, longitude in points]
+
+
+def backfill_districts(batch_size=2000, reclassify=False):
+    """
+    Assign districts to stored places in primary-key batches, writing only the
+    rows whose district changes. Returns (checked, changed).
+    """
+    from .models import Place
+
+    places = Place.objects.order_by('pk')
+    if not reclassify:
+        places = places.filter(district__isnull=True)
+
+    checked = changed = 0
+    last_pk = None
+    while True:
+        batch = places.filter(pk__gt=last_pk) if last_pk else places
+        batch = list(batch.only('pk', 'latitude', 'longitude', 'district')[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        codes = districts_for_points((place.latitude, place.longitude) for place in batch)
+        updated = []
+        for place, code in zip(batch, codes):
+            if place.district_id != code:
+                place.district_id = code
+                updated.append(place)
+        # bulk_update skips save(), which would classify each row again
+        Place.objects.bulk_update(updated, ['district'])
+        checked += len(batch)
+        changed += len(updated)
+    return checked, changed
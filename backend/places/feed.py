@@ -0,0 +1,296 @@
+"""
+Place feed building and warm-up
+Search results are turned into hydrated Place rows with hydrate_place(), and
+which (district, geography) search returned each place is kept in
+PlaceSearchMatch. SearchCoverage records when each pair was last searched,
+so build_feed() only searches pairs without fresh coverage and reads the
+feed itself from the database.
+
+When a user's preferences change, enqueue_warmup() queues their pairs, and
+the warm_feeds worker runs the same searches (one per district of a claimed
+batch) in the background, so the user's first feed load needs no search.
+"""
+import itertools
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from local_hosts import matching
+from services.google_places import GooglePlacesService
+from .api_budget import background_work, within_budget
+from .models import FeedWarmup, Place, PlaceSearchMatch, SearchCoverage
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_ADDRESS = 'Address not available'
+
+# A claim older than this is assumed to belong to a crashed worker
+STALE_CLAIM_AFTER = timedelta(minutes=10)
+
+# A pair searched more recently than this is served from the database
+COVERAGE_TTL = timedelta(hours=24)
+# Places a pair's searches haven't returned for this long drop out of its feed
+MATCH_TTL = timedelta(days=7)
+
+
+def needs_details(place, created):
+    return created or not place.formatted_address or place.formatted_address == PLACEHOLDER_ADDRESS or not place.photos_data
+
+
+def apply_details(place, place_details):
+    """
+    Copy a Place Details response onto a place and save it. Returns whether
+    the place's coordinates changed.
+    """
+    previous_location = (place.latitude, place.longitude)
+    
+    place.name = place_details.get('name', place.name)
+    place.formatted_address = place_details.get('formatted_address', place.formatted_address)
+    
+    location = place_details.get('geometry', {}).get('location', {})
+    place.latitude = location.get('lat', place.latitude)
+    place.longitude = location.get('lng', place.longitude)
+    
+    place.rating = place_details.get('rating')
+    place.user_ratings_total = place_details.get('user_ratings_total')
+    place.price_level = place_details.get('price_level')
+    place.place_types = place_details.get('types', [])
+    place.photos_data = place_details.get('photo_urls', [])
+    
+    # Extract description from editorial summary or reviews
+    description = ""
+    editorial_summary = place_details.get('editorial_summary', {})
+    if editorial_summary and editorial_summary.get('overview'):
+        description = editorial_summary.get('overview')
+    elif place_details.get('reviews') and len(place_details.get('reviews', [])) > 0:
+        # Use the first review as description if no editorial summary
+        first_review = place_details.get('reviews')[0]
+        description = first_review.get('text', '')[:300] + "..." if len(first_review.get('text', '')) > 300 else first_review.get('text', '')
+    
+    place.description = description
+    place.save()
+    
+    return (place.latitude, place.longitude) != previous_location
+
+
+def hydrate_place(places_service, place_data):
+    """
+    Place row for a search result, fetching its details from Google when it is
+    new or incomplete. Returns None for results without an id.
+    """
+    place_id = place_data.get('id')
+    if not place_id:
+        return None
+    
+    # Check if place already exists in our database
+    place, created = Place.objects.get_or_create(
+        google_place_id=place_id,
+        defaults={
+            'name': place_data.get('displayName', {}).get('text', 'Unknown'),
+            'formatted_address': PLACEHOLDER_ADDRESS,
+            'latitude': place_data.get('location', {}).get('latitude', 0),
+            'longitude': place_data.get('location', {}).get('longitude', 0),
+        }
+    )
+    
+    # If place is new or missing detailed info, fetch from Google Places API
+    moved = False
+    if needs_details(place, created):
+        place_details = places_service.get_place_details(place_id)
+        if place_details:
+            moved = apply_details(place, place_details)
+    
+    # New places, and places the details moved, need their host matches (re)computed
+    if created or moved:
+        matching.refresh_place(place)
+    
+    return place
+
+
+def record_search(district_code, geography, places, now=None):
+    """
+    Store which places a pair's search returned (hydrated Place rows) and
+    mark the pair as covered
+    """
+    now = now or timezone.now()
+    PlaceSearchMatch.objects.bulk_create(
+        [
+            PlaceSearchMatch(place=place, district_id=district_code, geography_id=geography,
+                             first_seen_at=now, last_seen_at=now)
+            for place in places
+        ],
+        update_conflicts=True,
+        unique_fields=['place', 'district', 'geography'],
+        update_fields=['last_seen_at'],
+    )
+    SearchCoverage.objects.update_or_create(
+        district_id=district_code, geography_id=geography,
+        defaults={'searched_at': now, 'place_count': len(places)},
+    )
+
+
+def search_and_record(places_service, district, geographies):
+    """
+    Search one district's geographies, hydrate the results and record them.
+    Returns {geography code: hydrated places} for the pairs that were searched.
+    """
+    by_geography = {geography.api_code: geography for geography in geographies}
+    searched = {}
+    for api_code, results in places_service.search_district(district, geographies).items():
+        geography = by_geography[api_code]
+        places = [place for place in (hydrate_place(places_service, data) for data in results) if place]
+        record_search(district.pk, geography.pk, places)
+        searched[geography.pk] = places
+    return searched
+
+
+def fresh_coverage(district_codes, geography_codes, now=None):
+    """{(district, geography): place count} for the pairs searched within COVERAGE_TTL"""
+    now = now or timezone.now()
+    return {
+        (district, geography): place_count
+        for district, geography, place_count in SearchCoverage.objects.filter(
+            district_id__in=district_codes,
+            geography_id__in=geography_codes,
+            searched_at__gte=now - COVERAGE_TTL,
+        ).values_list('district_id', 'geography_id', 'place_count')
+    }
+
+
+def uncovered_pairs(district_codes, geography_codes, now=None):
+    """(district, geography) code pairs without fresh search coverage"""
+    covered = fresh_coverage(district_codes, geography_codes, now)
+    return [pair for pair in itertools.product(district_codes, geography_codes) if pair not in covered]
+
+
+def feed_places(district_codes, geography_codes, now=None):
+    """Places recently returned by the searches of any of the pairs, from the database"""
+    now = now or timezone.now()
+    matches = PlaceSearchMatch.objects.filter(
+        place=OuterRef('pk'),
+        district_id__in=district_codes,
+        geography_id__in=geography_codes,
+        last_seen_at__gte=now - MATCH_TTL,
+    )
+    return Place.objects.filter(Exists(matches), is_active=True)
+
+
+def build_feed(districts, geographies):
+    """
+    Feed for District and Geography rows: pairs without fresh coverage are
+    searched first (one search per district), then every place is read back
+    from the database
+    """
+    district_codes = [district.pk for district in districts]
+    geography_codes = [geography.pk for geography in geographies]
+    gaps = uncovered_pairs(district_codes, geography_codes)
+
+    if gaps:
+        places_service = GooglePlacesService()
+        by_code = {geography.pk: geography for geography in geographies}
+        missing = {}
+        for district_code, geography_code in gaps:
+            missing.setdefault(district_code, []).append(by_code[geography_code])
+        for district in districts:
+            if district.pk in missing:
+                search_and_record(places_service, district, missing[district.pk])
+
+    return list(feed_places(district_codes, geography_codes))
+
+
+def enqueue_warmup(district_codes, geography_codes):
+    """Queue every (district, geography) pair of a preference set, in one statement"""
+    now = timezone.now()
+    pairs = [
+        FeedWarmup(district_id=district, geography_id=geography, status='PENDING', requested_at=now)
+        for district, geography in itertools.product(district_codes, geography_codes)
+    ]
+    FeedWarmup.objects.bulk_create(
+        pairs,
+        update_conflicts=True,
+        unique_fields=['district', 'geography'],
+        update_fields=['status', 'requested_at'],
+    )
+    return len(pairs)
+
+
+def claim_batch(batch_size):
+    """Mark up to batch_size queued pairs as RUNNING and return them"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            FeedWarmup.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING') | Q(status='RUNNING', started_at__lt=now - STALE_CLAIM_AFTER))
+            .order_by('requested_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        FeedWarmup.objects.filter(id__in=ids).update(status='RUNNING', started_at=now)
+    return list(FeedWarmup.objects.filter(id__in=ids).select_related('district', 'geography'))
+
+
+def finish(warmup, **result):
+    # A pair re-queued while we worked on it stays queued
+    FeedWarmup.objects.filter(id=warmup.id, status='RUNNING', started_at=warmup.started_at).update(
+        finished_at=timezone.now(), **result
+    )
+
+
+def warm_district(places_service, warmups):
+    """
+    Warm the claimed pairs of one district with a single merged search, then
+    hydrate the places; records each pair's outcome. Returns the pairs warmed.
+    """
+    district = warmups[0].district
+    try:
+        searched = search_and_record(places_service, district, [warmup.geography for warmup in warmups])
+    except Exception as e:
+        logger.exception(f"Error warming {district}")
+        for warmup in warmups:
+            finish(warmup, status='FAILED', last_error=str(e))
+        return 0
+
+    warmed = 0
+    for warmup in warmups:
+        if warmup.geography_id in searched:
+            finish(warmup, status='DONE', last_error='', place_count=len(searched[warmup.geography_id]))
+            warmed += 1
+        else:
+            finish(warmup, status='FAILED', last_error='Search request failed')
+    return warmed
+
+
+def warm_pending(batch_size=10):
+    """
+    Claim and warm one batch. Returns (warmed, failed) counts. Pairs that
+    already have fresh coverage (searched for another user, or by a feed
+    load) are marked done without a search. Nothing is claimed while the
+    background share of the search budget is used up.
+    """
+    # Fails fast (before claiming anything) when no API key is configured
+    places_service = GooglePlacesService()
+    with background_work():
+        if not within_budget('google_places', 'search'):
+            return 0, 0
+        batch = claim_batch(batch_size)
+        if not batch:
+            return 0, 0
+
+        covered = fresh_coverage(
+            {warmup.district_id for warmup in batch}, {warmup.geography_id for warmup in batch}
+        )
+        warmed = 0
+        by_district = {}
+        for warmup in batch:
+            pair = (warmup.district_id, warmup.geography_id)
+            if pair in covered:
+                finish(warmup, status='DONE', last_error='', place_count=covered[pair])
+                warmed += 1
+            else:
+                by_district.setdefault(warmup.district_id, []).append(warmup)
+
+        for warmups in by_district.values():
+            warmed += warm_district(places_service, warmups)
+    return warmed, len(batch) - warmed
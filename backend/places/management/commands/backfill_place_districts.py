@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from places.districts import backfill_districts
+
+
+class Command(BaseCommand):
+    help = "Assign stored places to the district containing them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--all', action='store_true',
+                            help="Reclassify every place, not only those without a district "
+                                 "(e.g. after district boundaries were changed)")
+
+    def handle(self, *args, **options):
+        checked, changed = backfill_districts(options['batch_size'], reclassify=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} places; updated the district of {changed}."
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from places.feed import warm_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued place searches ahead of users whose preferences changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling for new warm-ups instead of exiting when none are queued")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds to wait between polls when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        total_warmed = total_failed = 0
+        while True:
+            warmed, failed = warm_pending(options['batch_size'])
+            total_warmed += warmed
+            total_failed += failed
+
+            if warmed or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {total_warmed} district/geography pairs; {total_failed} failed."
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0003_place_location_index'),
+        ('preferences', '0004_add_missing_geographies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedWarmup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('requested_at', models.DateTimeField()),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('place_count', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('district', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='preferences.district')),
+                ('geography', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='preferences.geography')),
+            ],
+            options={
+                'db_table': 'feed_warmups',
+                'indexes': [models.Index(fields=['status', 'requested_at'], name='feed_warmup_due_idx')],
+                'unique_together': {('district', 'geography')},
+            },
+        ),
+    ]
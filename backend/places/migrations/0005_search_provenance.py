@@ -0,0 +1,46 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0004_feed_warmup'),
+        ('preferences', '0004_add_missing_geographies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_seen_at', models.DateTimeField()),
+                ('last_seen_at', models.DateTimeField()),
+                ('district', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='preferences.district')),
+                ('geography', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='preferences.geography')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_matches', to='places.place')),
+            ],
+            options={
+                'db_table': 'place_search_matches',
+                'indexes': [models.Index(fields=['district', 'geography', 'last_seen_at'], name='place_match_pair_idx')],
+                'unique_together': {('place', 'district', 'geography')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('searched_at', models.DateTimeField()),
+                ('place_count', models.PositiveIntegerField(default=0)),
+                ('district', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='preferences.district')),
+                ('geography', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='preferences.geography')),
+            ],
+            options={
+                'verbose_name_plural': 'Search coverage',
+                'db_table': 'search_coverage',
+                'unique_together': {('district', 'geography')},
+            },
+        ),
+    ]
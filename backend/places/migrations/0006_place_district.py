@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0005_search_provenance'),
+        ('preferences', '0004_add_missing_geographies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='district',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='places', to='preferences.district'),
+        ),
+    ]
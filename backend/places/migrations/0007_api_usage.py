@@ -0,0 +1,33 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0006_place_district'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('service', models.CharField(max_length=50)),
+                ('operation', models.CharField(max_length=50)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('refused', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'API usage',
+                'db_table': 'api_usage',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('day', 'service', 'operation', 'user'), name='api_usage_user_uniq'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('day', 'service', 'operation'), name='api_usage_background_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0007_api_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiCallCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('service', models.CharField(max_length=50)),
+                ('operation', models.CharField(max_length=50)),
+                ('calls', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'api_call_counters',
+                'unique_together': {('day', 'service', 'operation')},
+            },
+        ),
+    ]
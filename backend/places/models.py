@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 import uuid
 
+from .districts import district_for_point
+
 class Place(models.Model):
     """
     Store cached place data to reduce API calls and improve performance
@@ -14,6 +16,10 @@ class Place(models.Model):
     # Location data
     latitude = models.FloatField()
     longitude = models.FloatField()
+    # Derived from the coordinates on save (see places.districts)
+    district = models.ForeignKey(
+        'preferences.District', null=True, blank=True, on_delete=models.SET_NULL, related_name='places'
+    )
     
     # Place details
     rating = models.FloatField(null=True, blank=True)
@@ -38,6 +44,18 @@ class Place(models.Model):
     class Meta:
         db_table = 'places'
         ordering = ['-rating', 'name']
+        indexes = [
+            # Bounding-box lookups of places around a point
+            models.Index(fields=['latitude', 'longitude'], name='place_lat_lng_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.district_id = district_for_point(self.latitude, self.longitude)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'district'}
+        super().save(*args, **kwargs)
 
 
 class UserFavorite(models.Model):
@@ -69,3 +87,126 @@ class PlaceVisit(models.Model):
     
     class Meta:
         db_table = 'place_visits'
+
+
+class FeedWarmup(models.Model):
+    """
+    Queue of (district, geography) searches to run ahead of the user who
+    asked for them. The warm_feeds worker fills the search cache and stores
+    the places' details, so the next feed load doesn't call Google.
+    One row per pair: re-requesting a pair just queues it again.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    district = models.ForeignKey('preferences.District', on_delete=models.CASCADE, related_name='+')
+    geography = models.ForeignKey('preferences.Geography', on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    requested_at = models.DateTimeField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    place_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.geography_id} in {self.district_id} ({self.status})"
+
+    class Meta:
+        db_table = 'feed_warmups'
+        unique_together = ['district', 'geography']
+        indexes = [
+            models.Index(fields=['status', 'requested_at'], name='feed_warmup_due_idx'),
+        ]
+
+
+class PlaceSearchMatch(models.Model):
+    """
+    A place returned by the search for a (district, geography) pair.
+    last_seen_at is bumped whenever a search returns it again, so feeds can
+    be read from here instead of searching Google.
+    """
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='search_matches')
+    district = models.ForeignKey('preferences.District', on_delete=models.CASCADE, related_name='+')
+    geography = models.ForeignKey('preferences.Geography', on_delete=models.CASCADE, related_name='+')
+    first_seen_at = models.DateTimeField()
+    last_seen_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.place_id} for {self.geography_id} in {self.district_id}"
+
+    class Meta:
+        db_table = 'place_search_matches'
+        unique_together = ['place', 'district', 'geography']
+        indexes = [
+            models.Index(fields=['district', 'geography', 'last_seen_at'], name='place_match_pair_idx'),
+        ]
+
+
+class SearchCoverage(models.Model):
+    """When the search for a (district, geography) pair last succeeded"""
+    district = models.ForeignKey('preferences.District', on_delete=models.CASCADE, related_name='+')
+    geography = models.ForeignKey('preferences.Geography', on_delete=models.CASCADE, related_name='+')
+    searched_at = models.DateTimeField()
+    place_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.geography_id} in {self.district_id} ({self.searched_at:%Y-%m-%d %H:%M})"
+
+    class Meta:
+        db_table = 'search_coverage'
+        unique_together = ['district', 'geography']
+        verbose_name_plural = 'Search coverage'
+
+
+class ApiUsage(models.Model):
+    """
+    Daily ledger of billed external API calls, per service, operation and
+    user (null for background work). refused counts calls skipped because
+    the day's budget was used up. Written by places.api_budget.
+    """
+    day = models.DateField()
+    service = models.CharField(max_length=50)
+    operation = models.CharField(max_length=50)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    calls = models.PositiveIntegerField(default=0)
+    refused = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.service}.{self.operation} on {self.day}: {self.calls}"
+
+    class Meta:
+        db_table = 'api_usage'
+        verbose_name_plural = 'API usage'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'service', 'operation', 'user'], condition=models.Q(user__isnull=False),
+                name='api_usage_user_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'service', 'operation'], condition=models.Q(user__isnull=True),
+                name='api_usage_background_uniq',
+            ),
+        ]
+
+
+class ApiCallCounter(models.Model):
+    """
+    Calls counted against a day's budget for one external API operation,
+    shared by all processes; places.api_budget.spend() increments it with a
+    conditional UPDATE, so the budget can't be overshot by concurrent calls
+    """
+    day = models.DateField()
+    service = models.CharField(max_length=50)
+    operation = models.CharField(max_length=50)
+    calls = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.service}.{self.operation} on {self.day}: {self.calls}"
+
+    class Meta:
+        db_table = 'api_call_counters'
+        unique_together = ['day', 'service', 'operation']
@@ -18,7 +18,7 @@ class PlaceSerializer(serializers.ModelSerializer):
         """Check if current user has favorited this place"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return UserFavorite.objects.filter(user=request.user, place=obj).exists()
+            return UserFavorite.objects.filter(user_id=request.user.pk, place=obj).exists()
         return False
 
 class PlaceListSerializer(serializers.ModelSerializer):
@@ -37,7 +37,7 @@ class PlaceListSerializer(serializers.ModelSerializer):
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return UserFavorite.objects.filter(user=request.user, place=obj).exists()
+            return UserFavorite.objects.filter(user_id=request.user.pk, place=obj).exists()
         return False
     
     def get_first_photo_url(self, obj):
@@ -1,17 +1,29 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.tokens import ClaimsJWTAuthentication
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.db import transaction
-from datetime import datetime
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+import logging
 
 from .models import Place, UserFavorite, PlaceVisit
 from .serializers import PlaceSerializer, PlaceListSerializer, UserFavoriteSerializer
 from services.google_places import GooglePlacesService
 from services.weather import WeatherService
 from preferences.models import UserPreference
+from preferences.catalog import get_catalog
+from preferences.updates import current_codes
+from local_hosts import matching
+from . import feed
+from local_hosts.models import PlaceHostMatch
+from local_hosts.serializers import PlaceHostMatchSerializer
+from backend.metrics import timed
+from backend.conditional import PRIVATE_REVALIDATE, make_etag, not_modified, with_validators
+
+logger = logging.getLogger(__name__)
 
 class PlacesListView(APIView):
     """
@@ -19,15 +31,19 @@ class PlacesListView(APIView):
     Uses caching to improve performance
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
+    # May fan out to a Google Places search per preferred district whose
+    # results aren't stored yet
+    throttle_cost = 10
 
     def get(self, request):
         try:
             # Get user preferences
-            user_preferences = get_object_or_404(UserPreference, user=request.user)
+            user_preferences = get_object_or_404(UserPreference, user_id=request.user.pk)
             
-            districts = [d.name for d in user_preferences.preferred_districts.all()]
-            geographies = [g.name for g in user_preferences.preferred_geographies.all()]
+            codes = current_codes(user_preferences)
+            districts = get_catalog('districts').ordered(codes['preferred_districts'])
+            geographies = get_catalog('geographies').ordered(codes['preferred_geographies'])
             
             if not districts or not geographies:
                 return Response({
@@ -35,77 +51,21 @@ class PlacesListView(APIView):
                     "places": []
                 }, status=status.HTTP_200_OK)
             
-            # Initialize Google Places service
-            places_service = GooglePlacesService()
-            
-            # Search for places
-            places_data = places_service.search_places_by_preferences(districts, geographies)
-            
-            # Process and cache places with detailed information
-            processed_places = []
-            
-            for place_data in places_data:
-                place_id = place_data.get('id')
-                if not place_id:
-                    continue
-                
-                # Check if place already exists in our database
-                place, created = Place.objects.get_or_create(
-                    google_place_id=place_id,
-                    defaults={
-                        'name': place_data.get('displayName', {}).get('text', 'Unknown'),
-                        'formatted_address': 'Address not available',
-                        'latitude': place_data.get('location', {}).get('latitude', 0),
-                        'longitude': place_data.get('location', {}).get('longitude', 0),
-                    }
-                )
-                
-                # If place is new or missing detailed info, fetch from Google Places API
-                if created or not place.formatted_address or not place.formatted_address == 'Address not available' or not place.photos_data:
-                    place_details = places_service.get_place_details(place_id)
-                    
-                    if place_details:
-                        # Update place with detailed information
-                        place.name = place_details.get('name', place.name)
-                        place.formatted_address = place_details.get('formatted_address', place.formatted_address)
-                        
-                        location = place_details.get('geometry', {}).get('location', {})
-                        place.latitude = location.get('lat', place.latitude)
-                        place.longitude = location.get('lng', place.longitude)
-                        
-                        place.rating = place_details.get('rating')
-                        place.user_ratings_total = place_details.get('user_ratings_total')
-                        place.price_level = place_details.get('price_level')
-                        place.place_types = place_details.get('types', [])
-                        place.photos_data = place_details.get('photo_urls', [])
-                        
-                        # Extract description from editorial summary or reviews
-                        description = ""
-                        editorial_summary = place_details.get('editorial_summary', {})
-                        print("editorial_summary:")
-                        print(editorial_summary)
-                        if editorial_summary and editorial_summary.get('overview'):
-                            description = editorial_summary.get('overview')
-                        elif place_details.get('reviews') and len(place_details.get('reviews', [])) > 0:
-                            # Use the first review as description if no editorial summary
-                            first_review = place_details.get('reviews')[0]
-                            description = first_review.get('text', '')[:300] + "..." if len(first_review.get('text', '')) > 300 else first_review.get('text', '')
-                        
-                        place.description = description
-                        place.save()
-                
-                processed_places.append(place)
+            # Search pairs without fresh coverage, then read the feed from the database
+            with timed('feed'):
+                processed_places = feed.build_feed(districts, geographies)
             
             # Serialize places
-            serializer = PlaceListSerializer(
-                processed_places, 
-                many=True, 
-                context={'request': request}
-            )
+            with timed('serialize'):
+                places = PlaceListSerializer(
+                    processed_places, 
+                    many=True, 
+                    context={'request': request}
+                ).data
             
             return Response({
-                "places": serializer.data,
-                "count": len(serializer.data)
+                "places": places,
+                "count": len(places)
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -117,10 +77,14 @@ class PlacesListView(APIView):
 class PlaceDetailView(APIView):
     """
     Get detailed information about a specific place
-    Includes weather data and photos
+    Includes weather data, photos and suggested local hosts
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
+    # Place details and weather lookups on a cold cache
+    throttle_cost = 5
+    
+    LOCAL_HOSTS_LIMIT = 5
 
     def get(self, request):
         place_id = request.query_params.get('place_id')
@@ -131,93 +95,115 @@ class PlaceDetailView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Get or create place record
-            place, created = Place.objects.get_or_create(
-                google_place_id=place_id,
-                defaults={
-                    'name': 'Loading...',
-                    'formatted_address': 'Loading...',
-                    'latitude': 0,
-                    'longitude': 0,
-                }
-            )
-            
-            # If place is new or needs updating, fetch details from Google
-            if created or not place.photos_data:
-                places_service = GooglePlacesService()
-                place_details = places_service.get_place_details(place_id)
-                
-                if place_details:
-                    # Update place with detailed information
-                    place.name = place_details.get('name', place.name)
-                    place.formatted_address = place_details.get('formatted_address', place.formatted_address)
-                    
-                    location = place_details.get('geometry', {}).get('location', {})
-                    place.latitude = location.get('lat', place.latitude)
-                    place.longitude = location.get('lng', place.longitude)
-                    
-                    place.rating = place_details.get('rating')
-                    place.user_ratings_total = place_details.get('user_ratings_total')
-                    place.price_level = place_details.get('price_level')
-                    place.place_types = place_details.get('types', [])
-                    place.photos_data = place_details.get('photo_urls', [])
-                    
-                    # Extract description from editorial summary or reviews
-                    description = ""
-                    editorial_summary = place_details.get('editorial_summary', {})
-                    if editorial_summary and editorial_summary.get('overview'):
-                        description = editorial_summary.get('overview')
-                    elif place_details.get('reviews') and len(place_details.get('reviews', [])) > 0:
-                        # Use the first review as description if no editorial summary
-                        first_review = place_details.get('reviews')[0]
-                        description = first_review.get('text', '')[:300] + "..." if len(first_review.get('text', '')) > 300 else first_review.get('text', '')
-                    
-                    place.description = description
-                    place.save()
+            weather_service = WeatherService()
+            place = Place.objects.filter(google_place_id=place_id).first()
             
-            # Get weather data if coordinates are available
-            if place.latitude and place.longitude:
-                weather_service = WeatherService()
-                
-                # Check if weather data needs updating (older than 1 hour)
-                needs_weather_update = (
-                    not place.weather_data or 
-                    not place.last_weather_update or
-                    not weather_service.is_weather_data_fresh(place.last_weather_update)
-                )
-                
-                if needs_weather_update:
-                    weather_data = weather_service.get_weather_data(
-                        place.latitude, 
-                        place.longitude
-                    )
-                    
-                    if weather_data:
-                        place.weather_data = weather_data
-                        place.last_weather_update = datetime.now()
-                        place.save()
+            # A stored place with details and fresh weather needs no upstream
+            # call, so a revalidation is answered straight from the row
+            if place is None or not self.is_current(place, weather_service):
+                place = self.refresh_place(place_id, place, weather_service)
             
-            # Record user visit
-            PlaceVisit.objects.create(user=request.user, place=place)
+            etag = self.place_etag(request, place)
+            cached = not_modified(request, etag=etag, cache_control=PRIVATE_REVALIDATE, vary=['Authorization'])
+            self.record_visit(request, place)
+            if cached:
+                return cached
             
             # Serialize and return place data
             serializer = PlaceSerializer(place, context={'request': request})
             
-            return Response({
-                "place": serializer.data
+            # Suggested local hosts come precomputed from the matching index
+            host_matches = PlaceHostMatch.objects.filter(place=place).select_related('local_host').order_by('-score')[:self.LOCAL_HOSTS_LIMIT]
+            
+            response = Response({
+                "place": serializer.data,
+                "local_hosts": PlaceHostMatchSerializer(host_matches, many=True).data
             }, status=status.HTTP_200_OK)
+            return with_validators(response, etag=etag, cache_control=PRIVATE_REVALIDATE, vary=['Authorization'])
             
         except Exception as e:
             return Response({
                 "detail": f"Error fetching place details: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def needs_weather_update(self, place, weather_service):
+        """Whether the place has coordinates and its weather is missing or older than 1 hour"""
+        return bool(place.latitude and place.longitude) and (
+            not place.weather_data or
+            not place.last_weather_update or
+            not weather_service.is_weather_data_fresh(place.last_weather_update)
+        )
+    
+    def is_current(self, place, weather_service):
+        return bool(place.photos_data) and not self.needs_weather_update(place, weather_service)
+    
+    def refresh_place(self, place_id, place, weather_service):
+        """Create the place if needed and fetch missing details and stale weather"""
+        created = False
+        if place is None:
+            place, created = Place.objects.get_or_create(
+                google_place_id=place_id,
+                defaults={
+                    'name': 'Loading...',
+                    'formatted_address': 'Loading...',
+                    'latitude': 0,
+                    'longitude': 0,
+                }
+            )
+        
+        # If place is new or needs updating, fetch details from Google
+        moved = False
+        if created or not place.photos_data:
+            places_service = GooglePlacesService()
+            place_details = places_service.get_place_details(place_id)
+            if place_details:
+                moved = feed.apply_details(place, place_details)
+        
+        # New places, and places the details moved, need their host matches (re)computed
+        if created or moved:
+            matching.refresh_place(place)
+        
+        if self.needs_weather_update(place, weather_service):
+            weather_data = weather_service.get_weather_data(
+                place.latitude, 
+                place.longitude
+            )
+            
+            if weather_data:
+                place.weather_data = weather_data
+                place.last_weather_update = timezone.now()
+                place.save()
+        
+        return place
+    
+    def place_etag(self, request, place):
+        """
+        The payload changes with the place row (details and weather), the
+        user's favorite flag and the host matches
+        """
+        matches_version = PlaceHostMatch.objects.filter(place=place).aggregate(
+            count=Count('id'), latest=Max('updated_at')
+        )
+        return make_etag(
+            place.pk, place.updated_at.isoformat(),
+            UserFavorite.objects.filter(user_id=request.user.pk, place=place).exists(),
+            matches_version['count'], matches_version['latest'],
+        )
+    
+    def record_visit(self, request, place):
+        """Record the view for the user's history; a failed insert doesn't fail the request"""
+        try:
+            with transaction.atomic():
+                PlaceVisit.objects.create(user_id=request.user.pk, place=place)
+        except DatabaseError:
+            logger.exception(f"Could not record a visit to place {place.pk}")
+
 class ToggleFavoriteView(APIView):
     """
     Add or remove a place from user's favorites
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def post(self, request):
         place_id = request.data.get('place_id')
@@ -258,10 +244,10 @@ class UserFavoritesView(APIView):
     Get user's favorite places
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def get(self, request):
-        favorites = UserFavorite.objects.filter(user=request.user).select_related('place')
+        favorites = UserFavorite.objects.filter(user_id=request.user.pk).select_related('place')
         serializer = UserFavoriteSerializer(favorites, many=True)
         
         return Response({
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class PreferencesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'preferences'
+
+    def ready(self):
+        from .catalog import CATALOG_MODELS, invalidate_catalog
+
+        for model in CATALOG_MODELS.values():
+            post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f'invalidate_catalog_{model.__name__}')
+            post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f'invalidate_catalog_{model.__name__}')
@@ -0,0 +1,115 @@
+"""
+Reference catalog for District and Geography
+
+Each process keeps an immutable snapshot of both tables (get_catalog()), so
+listing, validating and serializing codes needs no query. The version of a
+table is a hash of its contents, kept in the shared cache and dropped
+whenever a row changes. A process compares its snapshot with the shared
+version at most every CATALOG_CHECK_INTERVAL seconds and reloads the table
+when they differ; the process that made the change reloads immediately.
+"""
+import hashlib
+import time
+from types import MappingProxyType
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import District, Geography
+
+CATALOG_MODELS = {
+    'districts': District,
+    'geographies': Geography,
+}
+
+# How long a process serves its snapshot before checking the shared version
+CATALOG_CHECK_INTERVAL = 10
+
+_snapshots = {}
+_checked_at = {}
+
+
+class Catalog:
+    """Immutable snapshot of one reference table"""
+
+    def __init__(self, name, version, rows):
+        self.name = name
+        self.version = version
+        # In the model's default ordering (by name)
+        self.rows = tuple(rows)
+        self.by_code = MappingProxyType({row.pk: row for row in self.rows})
+
+    def __contains__(self, code):
+        return code in self.by_code
+
+    def get(self, code):
+        return self.by_code.get(code)
+
+    def missing(self, codes):
+        """Codes that are not in the table, in the order given"""
+        return [code for code in codes if code not in self.by_code]
+
+    def known(self, codes):
+        """The codes that are in the table, without duplicates"""
+        return [code for code in dict.fromkeys(codes) if code in self.by_code]
+
+    def ordered(self, codes):
+        """Rows for a set of codes, in the table's ordering"""
+        codes = set(codes)
+        return [row for row in self.rows if row.pk in codes]
+
+
+def version_cache_key(name):
+    return f'catalog_version:{name}'
+
+
+def content_version(model, rows):
+    """Content hash of a table's rows, independent of their order"""
+    fields = [field.attname for field in model._meta.concrete_fields]
+    values = sorted((tuple(getattr(row, field) for field in fields) for row in rows), key=lambda v: v[0])
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()[:16]
+
+
+def load_catalog(name):
+    model = CATALOG_MODELS[name]
+    rows = list(model.objects.all())
+    version = content_version(model, rows)
+    cache.set(version_cache_key(name), version, None)
+    return Catalog(name, version, rows)
+
+
+def get_catalog(name):
+    """In-process snapshot of a reference table, e.g. get_catalog('districts')"""
+    snapshot = _snapshots.get(name)
+    now = time.monotonic()
+    if snapshot is not None and now - _checked_at.get(name, 0) < CATALOG_CHECK_INTERVAL:
+        return snapshot
+
+    if snapshot is None or cache.get(version_cache_key(name)) != snapshot.version:
+        snapshot = load_catalog(name)
+        _snapshots[name] = snapshot
+    _checked_at[name] = now
+    return snapshot
+
+
+def catalog_version(name):
+    """Content hash of a reference table, e.g. catalog_version('districts')"""
+    version = cache.get(version_cache_key(name))
+    if version is None:
+        version = get_catalog(name).version
+    return version
+
+
+def invalidate_catalog(sender, **kwargs):
+    """
+    Signal receiver: forget the version and snapshot of a reference table that
+    changed, once the change is committed (a reload before that would read,
+    and publish, the old rows)
+    """
+    for name, model in CATALOG_MODELS.items():
+        if sender is model:
+            def forget(name=name):
+                cache.delete(version_cache_key(name))
+                _snapshots.pop(name, None)
+
+            transaction.on_commit(forget)
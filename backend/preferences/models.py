@@ -36,6 +36,24 @@ class District(models.Model):
     def get_bounding_box(self):
         """Returns bounding box string for API usage"""
         return f"{self.sw_longitude},{self.sw_latitude},{self.ne_longitude},{self.ne_latitude}"
+
+    def get_rectangle(self):
+        """Returns the bounding box as a Places API (New) rectangle"""
+        return {
+            "low": {"latitude": self.sw_latitude, "longitude": self.sw_longitude},
+            "high": {"latitude": self.ne_latitude, "longitude": self.ne_longitude},
+        }
+
+    def centroid(self):
+        """Returns the (latitude, longitude) centre of the bounding box"""
+        return (self.sw_latitude + self.ne_latitude) / 2, (self.sw_longitude + self.ne_longitude) / 2
+
+    def contains(self, latitude, longitude):
+        """Whether a point lies inside the bounding box"""
+        return (
+            self.sw_latitude <= latitude <= self.ne_latitude
+            and self.sw_longitude <= longitude <= self.ne_longitude
+        )
     
     class Meta:
         db_table = 'districts'
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .catalog import get_catalog
 from .models import District, Geography, UserPreference
 
 class DistrictSerializer(serializers.ModelSerializer):
@@ -11,9 +12,36 @@ class GeographySerializer(serializers.ModelSerializer):
         model = Geography
         fields = ['code', 'name', 'description']
 
+class CatalogRelatedField(serializers.Field):
+    """
+    Read-only many-to-many to a catalog table. Only the link table is read
+    (nothing when the relation was prefetched, or when the codes are passed in
+    the 'known_codes' context); the rows themselves come from the in-process
+    catalog.
+    """
+    def __init__(self, catalog_name, serializer_class, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.catalog_name = catalog_name
+        self.serializer_class = serializer_class
+    
+    def to_representation(self, manager):
+        known = self.context.get('known_codes', {})
+        prefetched = getattr(manager.instance, '_prefetched_objects_cache', {})
+        if self.field_name in known:
+            codes = known[self.field_name]
+        elif manager.prefetch_cache_name in prefetched:
+            codes = [row.pk for row in manager.all()]
+        else:
+            codes = manager.through.objects.filter(
+                **{f'{manager.source_field_name}_id': manager.instance.pk}
+            ).values_list(f'{manager.target_field_name}_id', flat=True)
+        rows = get_catalog(self.catalog_name).ordered(codes)
+        return self.serializer_class(rows, many=True).data
+
 class UserPreferenceSerializer(serializers.ModelSerializer):
-    preferred_districts = DistrictSerializer(many=True, read_only=True)
-    preferred_geographies = GeographySerializer(many=True, read_only=True)
+    preferred_districts = CatalogRelatedField('districts', DistrictSerializer)
+    preferred_geographies = CatalogRelatedField('geographies', GeographySerializer)
     
     class Meta:
         model = UserPreference
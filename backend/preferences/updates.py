@@ -0,0 +1,88 @@
+"""
+Diff-based preference updates
+The preferred district/geography links are compared with the requested sets
+and only the difference is written (one bulk delete and one bulk insert per
+relation, in one transaction). The resulting state is returned so callers
+can respond without reading it back.
+"""
+import hashlib
+import json
+
+from django.db import transaction
+
+from .catalog import get_catalog
+from .models import UserPreference
+
+# Relation name -> catalog name
+PREFERENCE_RELATIONS = {
+    'preferred_districts': 'districts',
+    'preferred_geographies': 'geographies',
+}
+
+
+def preference_set_hash(codes, budget_range):
+    """
+    Canonical hash of a preference set: the same districts, geographies and
+    budget give the same hash whatever the order they were chosen in
+    """
+    canonical = {field: sorted(set(codes.get(field, ()))) for field in PREFERENCE_RELATIONS}
+    canonical['budget_range'] = budget_range or ''
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def link_model(field):
+    """Through model and target column of a preference relation"""
+    relation = getattr(UserPreference, field)
+    return relation.through, f'{relation.field.m2m_reverse_field_name()}_id'
+
+
+def current_codes(preferences):
+    """{relation: set of codes} for a user's preferences, from the link tables"""
+    codes = {}
+    for field in PREFERENCE_RELATIONS:
+        through, target = link_model(field)
+        codes[field] = set(
+            through.objects.filter(userpreference_id=preferences.pk).values_list(target, flat=True)
+        )
+    return codes
+
+
+def update_preferences(user_id, requested, budget_range=None):
+    """
+    Apply requested {relation: codes} (relations left out are kept) and an
+    optional budget range. Unknown codes are ignored.
+    Returns (preferences, codes, links_changed).
+    """
+    with transaction.atomic():
+        preferences = UserPreference.objects.select_for_update().get(user_id=user_id)
+        codes = current_codes(preferences)
+        links_changed = False
+
+        for field, catalog_name in PREFERENCE_RELATIONS.items():
+            if field not in requested:
+                continue
+            desired = set(get_catalog(catalog_name).known(requested[field]))
+            through, target = link_model(field)
+            removed = codes[field] - desired
+            added = desired - codes[field]
+            if removed:
+                through.objects.filter(
+                    userpreference_id=preferences.pk, **{f'{target}__in': removed}
+                ).delete()
+            if added:
+                through.objects.bulk_create([
+                    through(userpreference_id=preferences.pk, **{target: code}) for code in added
+                ])
+            codes[field] = desired
+            links_changed = links_changed or bool(removed or added)
+
+        update_fields = ['updated_at']
+        if budget_range and budget_range != preferences.budget_range:
+            preferences.budget_range = budget_range
+            update_fields.append('budget_range')
+        if links_changed or len(update_fields) > 1:
+            # Also what tells the user-detail cache the preferences changed
+            preferences.save(update_fields=update_fields)
+
+    return preferences, codes, links_changed
@@ -1,82 +1,92 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from authentication.tokens import ClaimsJWTAuthentication
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
-from .models import District, Geography, UserPreference
+from .models import UserPreference
+from .catalog import catalog_version, get_catalog
+from .updates import PREFERENCE_RELATIONS, current_codes, preference_set_hash, update_preferences
+from places.feed import enqueue_warmup
+from backend.conditional import CATALOG_CACHE, make_etag, not_modified, with_validators
 from .serializers import DistrictSerializer, GeographySerializer, UserPreferenceSerializer
 
 class DistrictsListView(APIView):
     """Get list of all available districts"""
     
     def get(self, request):
-        districts = District.objects.all()
-        serializer = DistrictSerializer(districts, many=True)
-        return Response({
+        etag = make_etag('districts', catalog_version('districts'))
+        cached = not_modified(request, etag=etag, cache_control=CATALOG_CACHE)
+        if cached:
+            return cached
+        
+        serializer = DistrictSerializer(get_catalog('districts').rows, many=True)
+        response = Response({
             "districts": serializer.data
         }, status=status.HTTP_200_OK)
+        return with_validators(response, etag=etag, cache_control=CATALOG_CACHE)
 
 class GeographiesListView(APIView):
     """Get list of all available geography types"""
     
     def get(self, request):
-        geographies = Geography.objects.all()
-        serializer = GeographySerializer(geographies, many=True)
-        return Response({
+        etag = make_etag('geographies', catalog_version('geographies'))
+        cached = not_modified(request, etag=etag, cache_control=CATALOG_CACHE)
+        if cached:
+            return cached
+        
+        serializer = GeographySerializer(get_catalog('geographies').rows, many=True)
+        response = Response({
             "geographies": serializer.data
         }, status=status.HTTP_200_OK)
+        return with_validators(response, etag=etag, cache_control=CATALOG_CACHE)
 
 class UserPreferencesView(APIView):
     """Get and update user preferences"""
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
+    # PUT: auth user, locked preference row, two link reads, a delete and an
+    # insert per relation, the update and the feed warm-up upsert
+    query_budget = 10
     
     def get(self, request):
         """Get user's current preferences"""
+        preferences = get_object_or_404(UserPreference, user_id=request.user.pk)
+        codes = current_codes(preferences)
+        return Response({
+            "preferences": UserPreferenceSerializer(preferences, context={'known_codes': codes}).data,
+            "preference_hash": preference_set_hash(codes, preferences.budget_range),
+        }, status=status.HTTP_200_OK)
+    
+    def put(self, request):
+        """Update user preferences; only the changed links are written"""
+        requested = {
+            field: request.data[field]
+            for field in PREFERENCE_RELATIONS
+            # An empty or missing list leaves the relation unchanged
+            if request.data.get(field)
+        }
+        
         try:
-            preferences = get_object_or_404(UserPreference, user=request.user)
-            serializer = UserPreferenceSerializer(preferences)
-            return Response({
-                "preferences": serializer.data
-            }, status=status.HTTP_200_OK)
+            preferences, codes, links_changed = update_preferences(
+                request.user.pk, requested, request.data.get('budget_range')
+            )
         except UserPreference.DoesNotExist:
             return Response({
                 "detail": "No preferences found for user"
             }, status=status.HTTP_404_NOT_FOUND)
-    
-    def put(self, request):
-        """Update user preferences"""
-        try:
-            preferences = get_object_or_404(UserPreference, user=request.user)
-            
-            # Update budget range if provided
-            budget_range = request.data.get('budget_range')
-            if budget_range:
-                preferences.budget_range = budget_range
-            
-            # Update preferred districts if provided
-            district_codes = request.data.get('preferred_districts', [])
-            if district_codes:
-                districts = District.objects.filter(code__in=district_codes)
-                preferences.preferred_districts.set(districts)
-            
-            # Update preferred geographies if provided
-            geography_codes = request.data.get('preferred_geographies', [])
-            if geography_codes:
-                geographies = Geography.objects.filter(code__in=geography_codes)
-                preferences.preferred_geographies.set(geographies)
-            
-            preferences.save()
-            
-            serializer = UserPreferenceSerializer(preferences)
-            return Response({
-                "detail": "Preferences updated successfully",
-                "preferences": serializer.data
-            }, status=status.HTTP_200_OK)
-            
         except Exception as e:
             return Response({
                 "detail": f"Error updating preferences: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        # Warm the place feed for the new combination in the background
+        if links_changed:
+            enqueue_warmup(codes['preferred_districts'], codes['preferred_geographies'])
+        
+        return Response({
+            "detail": "Preferences updated successfully",
+            "preferences": UserPreferenceSerializer(preferences, context={'known_codes': codes}).data,
+            "preference_hash": preference_set_hash(codes, preferences.budget_range),
+        }, status=status.HTTP_200_OK)
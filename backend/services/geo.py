@@ -0,0 +1,142 @@
+"""
+Geo helpers
+Geohash encoding and great-circle distances, shared by the apps that store
+coordinates (places, local hosts)
+"""
+import math
+from typing import List, Tuple
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOHASH_PRECISION = 9
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Approximate geohash cell (height, width at the equator) in km by precision
+GEOHASH_CELL_KM = {
+    1: (4992.6, 5009.4),
+    2: (624.1, 1252.3),
+    3: (156.0, 156.5),
+    4: (19.5, 39.1),
+    5: (4.89, 4.89),
+    6: (0.61, 1.22),
+    7: (0.153, 0.153),
+}
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode coordinates as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Return the (south, west, north, east) bounds of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_neighbors(geohash: str) -> List[str]:
+    """Return the cell itself and its (up to) eight surrounding cells"""
+    south, west, north, east = geohash_bounds(geohash)
+    lat_step = north - south
+    lng_step = east - west
+    center_lat = (south + north) / 2
+    center_lng = (west + east) / 2
+
+    cells = []
+    for dlat in (-1, 0, 1):
+        lat = center_lat + dlat * lat_step
+        if lat < -90 or lat > 90:
+            continue
+        for dlng in (-1, 0, 1):
+            lng = center_lng + dlng * lng_step
+            lng = (lng + 180) % 360 - 180
+            cell = geohash_encode(lat, lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def geohash_precision_for_radius(radius_km: float, latitude: float = 0.0) -> int:
+    """
+    Longest geohash precision whose cells are at least radius_km across,
+    so a circle of that radius is covered by a cell and its neighbours
+    """
+    shrink = max(math.cos(math.radians(latitude)), 0.01)
+    best = 1
+    for precision, (height, width) in sorted(GEOHASH_CELL_KM.items()):
+        if min(height, width * shrink) >= radius_km:
+            best = precision
+    return best
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_km_expression(latitude: float, longitude: float,
+                           lat_field: str = 'latitude', lng_field: str = 'longitude'):
+    """Database expression for the haversine distance from a point to each row"""
+    lat = Value(latitude, output_field=FloatField())
+    lng = Value(longitude, output_field=FloatField())
+    a = (
+        Power(Sin((Radians(F(lat_field)) - Radians(lat)) / 2), 2)
+        + Cos(Radians(lat)) * Cos(Radians(F(lat_field)))
+        * Power(Sin((Radians(F(lng_field)) - Radians(lng)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(Sqrt(a))
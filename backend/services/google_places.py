@@ -2,14 +2,131 @@
 Google Places API Service
 Handles all interactions with Google Places API
 """
+import hashlib
+import re
 import requests
 import logging
+
+from backend.metrics import upstream_call
+from places.api_budget import BudgetExhausted, spend
 from django.conf import settings
+from django.core.cache import cache
 from typing import List, Dict, Optional
 import os
 
 logger = logging.getLogger(__name__)
 
+# Text search results are shared by every user with the same preferences
+SEARCH_CACHE_TIMEOUT = 6 * 60 * 60
+# A district/geography pair with nothing inside the district is retried sooner
+EMPTY_SEARCH_CACHE_TIMEOUT = 30 * 60
+
+# Preference searches: one text search covers up to this many geographies of
+# a district, asking for RESULTS_PER_GEOGRAPHY results each (Text Search
+# returns at most MAX_RESULTS_PER_SEARCH)
+MAX_GEOGRAPHIES_PER_SEARCH = 5
+RESULTS_PER_GEOGRAPHY = 8
+MAX_RESULTS_PER_SEARCH = 20
+
+# How results are classified back to geographies (keyed by Geography.api_code):
+# Google place types, and words that mark a place's name
+GEOGRAPHY_MATCHERS = {
+    'adventure': ({'adventure_sports_center', 'amusement_park', 'hiking_area'}, ('adventure', 'rafting', 'trekking', 'zipline')),
+    'beach': ({'beach'}, ('beach',)),
+    'cave': (set(), ('cave', 'caves')),
+    'cliff': (set(), ('cliff',)),
+    'cultural': ({'cultural_center', 'museum', 'art_gallery', 'cultural_landmark'}, ('museum', 'kalamandalam', 'cultural')),
+    'forest': ({'national_park', 'wildlife_park', 'wildlife_refuge'}, ('forest', 'wildlife', 'sanctuary')),
+    'geyser': (set(), ('geyser',)),
+    'glacier': (set(), ('glacier',)),
+    'mountain': ({'hiking_area'}, ('hill', 'hills', 'mala', 'viewpoint', 'view point')),
+    'historical': ({'historical_landmark', 'historical_place', 'monument'}, ('fort', 'palace', 'heritage')),
+    'hot_spring': (set(), ('hot spring',)),
+    'lake': (set(), ('lake', 'backwater', 'backwaters', 'kayal')),
+    'peak': (set(), ('peak', 'summit')),
+    'mountain_region': ({'hiking_area'}, ('ghat', 'ghats', 'hills')),
+    'national_park': ({'national_park'}, ('national park',)),
+    'natural_area': ({'park', 'garden'}, ('nature', 'eco')),
+    'protected_area': ({'wildlife_refuge', 'national_park'}, ('sanctuary', 'reserve')),
+    'reef': (set(), ('reef',)),
+    'rock_formation': (set(), ('rock', 'rocks', 'para')),
+    'sand_dune': (set(), ('dune', 'dunes')),
+    'sandy_area': ({'beach'}, ('sand',)),
+    'sea': ({'beach'}, ('sea', 'beach')),
+    'religious': ({'hindu_temple', 'church', 'mosque', 'synagogue', 'place_of_worship'}, ('temple', 'church', 'mosque', 'shrine')),
+    'spring': (set(), ('spring',)),
+    'water_body': (set(), ('falls', 'waterfall', 'waterfalls', 'dam', 'river')),
+}
+
+# Text Search includedType filter for a search covering a single geography
+GEOGRAPHY_INCLUDED_TYPES = {
+    'adventure': 'adventure_sports_center',
+    'beach': 'beach',
+    'historical': 'historical_landmark',
+    'national_park': 'national_park',
+}
+
+
+def within_district(places: List[Dict], district) -> List[Dict]:
+    """
+    Drop results outside a district's bounding box (locationRestriction is
+    only as good as the rectangle, and results without a location can't be
+    placed at all)
+    """
+    return [
+        place for place in places
+        if 'location' in place
+        and district.contains(place['location'].get('latitude', 0), place['location'].get('longitude', 0))
+    ]
+
+
+def pair_cache_key(district: str, api_code: str) -> str:
+    return 'google_places_pair:' + hashlib.sha1(f'{district}|{api_code}'.encode('utf-8')).hexdigest()
+
+
+def plan_searches(district: str, geographies: List) -> List[Dict]:
+    """
+    Group a district's geographies into as few text searches as possible.
+    geographies are objects with name and api_code (e.g. Geography rows).
+    """
+    plans = []
+    for start in range(0, len(geographies), MAX_GEOGRAPHIES_PER_SEARCH):
+        group = geographies[start:start + MAX_GEOGRAPHIES_PER_SEARCH]
+        if len(group) == 1:
+            query = f"tourist destinations in the {group[0].name} regions of {district}, Kerala"
+        else:
+            names = ', '.join(geography.name for geography in group)
+            query = f"tourist destinations in {district}, Kerala: {names}"
+        plans.append({
+            'query': query,
+            'geographies': group,
+            'max_results': min(MAX_RESULTS_PER_SEARCH, RESULTS_PER_GEOGRAPHY * len(group)),
+            'included_type': GEOGRAPHY_INCLUDED_TYPES.get(group[0].api_code) if len(group) == 1 else None,
+        })
+    return plans
+
+
+def matches_geography(place: Dict, geography) -> bool:
+    place_types, words = GEOGRAPHY_MATCHERS.get(geography.api_code, (set(), ()))
+    if place_types & set(place.get('types', [])):
+        return True
+    name = place.get('displayName', {}).get('text', '').lower()
+    words = words or (geography.name.lower(),)
+    return any(re.search(rf'\b{re.escape(word)}\b', name) for word in words)
+
+
+def classify_places(places: List[Dict], geographies: List) -> Dict:
+    """
+    Split a merged search's results by geography, from their types and names.
+    Results that match none stay with every geography of the search.
+    """
+    classified = {geography.api_code: [] for geography in geographies}
+    for place in places:
+        matched = [geography for geography in geographies if matches_geography(place, geography)]
+        for geography in matched or geographies:
+            classified[geography.api_code].append(place)
+    return classified
+
 class GooglePlacesService:
     """Service class for Google Places API interactions"""
     
@@ -25,12 +142,30 @@ class GooglePlacesService:
         self.headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "places.displayName,places.id,places.location"
+            "X-Goog-FieldMask": "places.displayName,places.id,places.location,places.types"
         }
     
-    def search_places(self, query: str, max_results: int = 10) -> List[Dict]:
+    def search_places(self, query: str, max_results: int = 10, bounds: Optional[Dict] = None) -> List[Dict]:
         """
         Search for places using text query
+        Non-empty results are cached for SEARCH_CACHE_TIMEOUT
+        """
+        cache_key = 'google_places_search:' + hashlib.sha1(f'{query}|{max_results}|{bounds}'.encode('utf-8')).hexdigest()
+        places = cache.get(cache_key)
+        if places is not None:
+            return places
+        
+        places = self.text_search(query, max_results, bounds=bounds)
+        if places:
+            cache.set(cache_key, places, SEARCH_CACHE_TIMEOUT)
+        return places or []
+    
+    def text_search(self, query: str, max_results: int, included_type: Optional[str] = None,
+                    bounds: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """
+        One uncached Text Search call. bounds is a rectangle
+        ({"low": {...}, "high": {...}}) results must lie in.
+        Returns None if the request failed.
         """
         try:
             payload = {
@@ -38,20 +173,29 @@ class GooglePlacesService:
                 "maxResultCount": max_results,
                 "languageCode": "en"
             }
+            if included_type:
+                payload["includedType"] = included_type
+            if bounds:
+                payload["locationRestriction"] = {"rectangle": bounds}
             
-            response = requests.post(
-                self.search_url, 
-                headers=self.headers, 
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
+            spend('google_places', 'search')
+            with upstream_call('google_places', 'search'):
+                response = requests.post(
+                    self.search_url, 
+                    headers=self.headers, 
+                    json=payload,
+                    timeout=30
+                )
+                response.raise_for_status()
             
             return response.json().get("places", [])
             
+        except BudgetExhausted as e:
+            logger.warning(f"Skipping place search: {e}")
+            return None
         except requests.RequestException as e:
             logger.error(f"Error searching places: {e}")
-            return []
+            return None
     
     def get_place_details(self, place_id: str) -> Optional[Dict]:
         """
@@ -64,49 +208,54 @@ class GooglePlacesService:
                 "key": self.api_key
             }
             
-            response = requests.get(self.details_url, params=params, timeout=30)
-            response.raise_for_status()
+            spend('google_places', 'details')
+            with upstream_call('google_places', 'details'):
+                response = requests.get(self.details_url, params=params, timeout=30)
+                response.raise_for_status()
             
             result = response.json().get("result", {})
             
-            # Process photos to get URLs
-            photos = result.get("photos", [])
+            # Process photos to get URLs. Each one is a billed Place Photo
+            # request once a client loads it, so issued URLs are counted
+            # against the photo budget; past it the place has no photos.
+            photo_refs = [photo.get("photo_reference") for photo in result.get("photos", [])[:5]]  # Limit to 5 photos
+            photo_refs = [photo_ref for photo_ref in photo_refs if photo_ref]
             photo_urls = []
             
-            for photo in photos[:5]:  # Limit to 5 photos
-                photo_ref = photo.get("photo_reference")
-                if photo_ref:
-                    photo_url = f"{self.photo_url}?maxwidth=800&photoreference={photo_ref}&key={self.api_key}"
-                    photo_urls.append(photo_url)
+            if photo_refs:
+                try:
+                    spend('google_places', 'photo', count=len(photo_refs))
+                except BudgetExhausted as e:
+                    logger.warning(f"No photos for {place_id}: {e}")
+                else:
+                    photo_urls = [
+                        f"{self.photo_url}?maxwidth=800&photoreference={photo_ref}&key={self.api_key}"
+                        for photo_ref in photo_refs
+                    ]
             
             result["photo_urls"] = photo_urls
             result.pop("photos", None)  # Remove original photos data
             
             return result
             
+        except BudgetExhausted as e:
+            logger.warning(f"Skipping details for {place_id}: {e}")
+            return None
         except requests.RequestException as e:
             logger.error(f"Error getting place details for {place_id}: {e}")
             return None
     
-    def search_places_by_preferences(self, districts: List[str], geographies: List[str]) -> List[Dict]:
+    def search_places_by_preferences(self, districts: List, geographies: List) -> List[Dict]:
         """
         Search for places based on user preferences
+        districts and geographies are District and Geography rows.
+        Costs at most one call per district (per MAX_GEOGRAPHIES_PER_SEARCH
+        geographies), and none for district/geography pairs already cached.
         """
         all_places = []
         
-        for geography in geographies:
-            for district in districts:
-                query = f"tourist destinations in the {geography} regions of {district}, Kerala"
-                places = self.search_places(query, max_results=8)
-                
-                # Add context info to each place
-                for place in places:
-                    place["search_context"] = {
-                        "district": district,
-                        "geography": geography,
-                        "query": query
-                    }
-                
+        for district in districts:
+            for places in self.search_district(district, geographies).values():
                 all_places.extend(places)
         
         # Remove duplicates based on place ID
@@ -120,3 +269,50 @@ class GooglePlacesService:
                 unique_places.append(place)
         
         return unique_places
+    
+    def search_district(self, district, geographies: List) -> Dict[str, List[Dict]]:
+        """
+        Places for several geographies of one district, as {api_code: places}.
+        Geographies whose search failed are left out. Results are cached per
+        (district, geography) pair, so only uncached geographies are searched,
+        merged into as few calls as possible. Searches are restricted to the
+        district's bounding box, and results outside it are dropped before
+        they are cached or hydrated.
+        """
+        results = {}
+        uncached = []
+        for geography in geographies:
+            places = cache.get(pair_cache_key(district.name, geography.api_code))
+            if places is None:
+                uncached.append(geography)
+            else:
+                results[geography.api_code] = places
+        
+        for plan in plan_searches(district.name, uncached):
+            places = self.text_search(
+                plan['query'], plan['max_results'], plan['included_type'], bounds=district.get_rectangle()
+            )
+            if places is None:
+                continue
+            places = within_district(places, district)
+            for api_code, matched in classify_places(places, plan['geographies']).items():
+                results[api_code] = matched
+                timeout = SEARCH_CACHE_TIMEOUT if matched else EMPTY_SEARCH_CACHE_TIMEOUT
+                cache.set(pair_cache_key(district.name, api_code), matched, timeout)
+        
+        district_places = {}
+        for geography in geographies:
+            if geography.api_code not in results:
+                continue
+            # Add context info to each place
+            district_places[geography.api_code] = [
+                dict(place, search_context={
+                    "district": district.name,
+                    "district_code": district.pk,
+                    "geography": geography.name,
+                    "geography_code": geography.pk,
+                })
+                for place in results[geography.api_code]
+            ]
+        
+        return district_places
@@ -8,6 +8,11 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional
 import os
 
+from django.utils import timezone
+
+from backend.metrics import upstream_call
+from places.api_budget import BudgetExhausted, spend
+
 logger = logging.getLogger(__name__)
 
 class WeatherService:
@@ -33,8 +38,10 @@ class WeatherService:
                 "exclude": "alerts,minutely"  # Exclude unnecessary data
             }
             
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
+            spend('openweather', 'onecall')
+            with upstream_call('openweather', 'onecall'):
+                response = requests.get(self.base_url, params=params, timeout=30)
+                response.raise_for_status()
             
             data = response.json()
             
@@ -61,6 +68,9 @@ class WeatherService:
             
             return weather_data
             
+        except BudgetExhausted as e:
+            logger.warning(f"Skipping weather for {latitude}, {longitude}: {e}")
+            return None
         except requests.RequestException as e:
             logger.error(f"Error fetching weather data for {latitude}, {longitude}: {e}")
             return None
@@ -72,4 +82,4 @@ class WeatherService:
         if not last_update:
             return False
         
-        return datetime.now() - last_update < timedelta(hours=hours)
+        return timezone.now() - last_update < timedelta(hours=hours)
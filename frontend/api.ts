@@ -289,15 +289,21 @@ export const localHostAPI = {
   },
 
   // Public views
+  // Keyset-paginated: pass the previous response's `nextCursor` as `cursor`
+  // to get the next page. `count` is only returned with `includeTotal`.
   getLocalHosts: async (params?: {
     services?: string;
     search?: string;
-    page?: number;
+    cursor?: string | null;
+    pageSize?: number;
+    includeTotal?: boolean;
   }): Promise<any> => {
     const searchParams = new URLSearchParams();
     if (params?.services) searchParams.append('services', params.services);
     if (params?.search) searchParams.append('search', params.search);
-    if (params?.page) searchParams.append('page', params.page.toString());
+    if (params?.cursor) searchParams.append('cursor', params.cursor);
+    if (params?.pageSize) searchParams.append('page_size', params.pageSize.toString());
+    if (params?.includeTotal) searchParams.append('include_total', 'true');
     
     const response = await apiFetch(
       `/local-hosts/${searchParams.toString() ? '?' + searchParams.toString() : ''}`,
@@ -310,7 +316,10 @@ export const localHostAPI = {
       throw new Error(error.detail || 'Failed to fetch local hosts');
     }
     
-    return response.json();
+    const data = await response.json();
+    // `next` is an absolute URL; only its cursor is needed for the next call
+    const match = data.next ? /[?&]cursor=([^&]+)/.exec(data.next) : null;
+    return { ...data, nextCursor: match ? decodeURIComponent(match[1]) : null };
   },
 
   getLocalHostDetail: async (id: number): Promise<any> => {